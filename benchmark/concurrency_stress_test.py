@@ -0,0 +1,120 @@
+# Runs a simulated watcher writing at a high rate alongside repeated day loads on a synthetic
+# database, and reports the lock errors and the latencies of both.
+# Run from the repository root: python3 -m benchmark.concurrency_stress_test [--seconds 20] [--ticks-per-second 100]
+# --journal-mode delete gives the rollback journal which was used before WAL, for comparison.
+import argparse
+import datetime
+import multiprocessing
+import os
+import shutil
+import sqlite3
+import time
+
+from benchmark import synthetic_database
+from mtag.helper import database_helper, filesystem_helper
+from mtag.repository import LoggedEntryRepository, TaggedEntryRepository, ActivityEntryRepository
+
+
+def get_percentile(latencies, percentile: float) -> float:
+    latencies = sorted(latencies)
+    return latencies[min(int(len(latencies) * percentile), len(latencies) - 1)]
+
+
+def report(name: str, latencies, errors: int) -> str:
+    return (f"{name}: {len(latencies)} operations, {errors} lock errors,"
+            f" p50 {get_percentile(latencies, 0.5):.2f} ms, p99 {get_percentile(latencies, 0.99):.2f} ms,"
+            f" max {max(latencies):.2f} ms")
+
+
+def run_writer(userdata_path: str, journal_mode: str, ticks_per_second: float, deadline: float,
+               ready: multiprocessing.Event, results: multiprocessing.Queue) -> None:
+    filesystem_helper.user_data_path = userdata_path
+    conn = database_helper.open_connection()
+    conn.execute(f"PRAGMA journal_mode={journal_mode}")
+    ready.set()
+
+    # Like the watcher, the latest entry is extended each tick and a new one is started now and then
+    le_id, le_last_update, aw_id = conn.execute("SELECT le_id, le_last_update, le_application_window_id"
+                                                " FROM logged_entry ORDER BY le_id DESC LIMIT 1").fetchone()
+    latencies = []
+    errors = 0
+    tick = 0
+    while time.time() < deadline:
+        start = time.perf_counter()
+        tick += 1
+        le_last_update += 1
+        try:
+            with conn:
+                if tick % 10 == 0:
+                    le_id = conn.execute("INSERT INTO logged_entry(le_application_window_id, le_start, le_last_update)"
+                                         " VALUES (?, ?, ?)", (aw_id, le_last_update, le_last_update)).lastrowid
+                else:
+                    conn.execute("UPDATE logged_entry SET le_last_update = ? WHERE le_id = ?", (le_last_update, le_id))
+        except sqlite3.OperationalError:
+            errors += 1
+        latencies.append((time.perf_counter() - start) * 1000)
+        time.sleep(max(0.0, 1 / ticks_per_second - (time.perf_counter() - start)))
+
+    conn.close()
+    results.put(report(name="writer", latencies=latencies, errors=errors))
+
+
+def run_reader(userdata_path: str, deadline: float, results: multiprocessing.Queue) -> None:
+    filesystem_helper.user_data_path = userdata_path
+    conn = database_helper.open_read_only_connection()
+    latest_start = conn.execute("SELECT MAX(le_start) FROM logged_entry").fetchone()[0]
+    latest_day = datetime.datetime.fromtimestamp(latest_start).replace(hour=0, minute=0, second=0)
+
+    # Loads the latest month day by day, like the timeline does
+    repositories = [LoggedEntryRepository(), TaggedEntryRepository(), ActivityEntryRepository()]
+    latencies = []
+    errors = 0
+    loads = 0
+    while time.time() < deadline:
+        day = latest_day - datetime.timedelta(days=loads % 30)
+        loads += 1
+        start = time.perf_counter()
+        try:
+            for repository in repositories:
+                repository.get_all_in_range(conn=conn, from_datetime=day, to_datetime=day + datetime.timedelta(days=1))
+        except sqlite3.OperationalError:
+            errors += 1
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    conn.close()
+    results.put(report(name="reader", latencies=latencies, errors=errors))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--years", type=int, default=3)
+    parser.add_argument("--seconds", type=float, default=20)
+    parser.add_argument("--ticks-per-second", type=float, default=100)
+    parser.add_argument("--journal-mode", choices=["wal", "delete"], default="wal")
+    args = parser.parse_args()
+
+    database_file_path = synthetic_database.use_temporary_userdata_path()
+    synthetic_database.create(path=database_file_path, years=args.years)
+    database_helper.create_connection().close()
+    userdata_path = os.path.dirname(database_file_path)
+
+    results = multiprocessing.Queue()
+    ready = multiprocessing.Event()
+    deadline = time.time() + args.seconds
+    writer = multiprocessing.Process(target=run_writer, args=(userdata_path, args.journal_mode,
+                                                              args.ticks_per_second, deadline, ready, results))
+    writer.start()
+    ready.wait()
+    reader = multiprocessing.Process(target=run_reader, args=(userdata_path, deadline, results))
+    reader.start()
+
+    print(f"journal mode {args.journal_mode}, {args.ticks_per_second:g} ticks per second for {args.seconds:g} s")
+    for _ in range(2):
+        print(results.get())
+    writer.join()
+    reader.join()
+    shutil.rmtree(userdata_path)
+
+
+if __name__ == "__main__":
+    main()
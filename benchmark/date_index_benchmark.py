@@ -0,0 +1,94 @@
+# Compares the date queries before and after the version 3 indexes on a synthetic database.
+# Run from the repository root: python3 -m benchmark.date_index_benchmark [--years 3] [--days 500]
+import argparse
+import datetime
+import os
+import shutil
+import sqlite3
+import time
+
+from benchmark import synthetic_database
+from mtag.helper import database_helper
+
+
+# The queries of get_all_by_date before version 3, which OR two ranges together
+OLD_QUERY = ("SELECT {p}_id FROM {table} WHERE"
+             " (:from_date <= {p}_last_update AND {p}_last_update < :to_date)"
+             " OR"
+             " (:from_date <= {p}_start AND {p}_start < :to_date)"
+             " ORDER BY {p}_start ASC")
+
+# The range scan of version 3, which returns the same entries
+NEW_QUERY = ("SELECT {p}_id FROM {table}"
+             " WHERE {p}_start >= IFNULL((SELECT MAX({p}_start) FROM {table}"
+             "                           WHERE {p}_start < :from_date), :from_date)"
+             " AND {p}_start < :to_date"
+             " AND {p}_last_update >= :from_date"
+             " AND ({p}_start >= :from_date OR {p}_last_update < :to_date)"
+             " ORDER BY {p}_start ASC")
+
+OLD_LATEST_QUERY = "SELECT * FROM {table} ORDER BY {p}_last_update DESC"
+NEW_LATEST_QUERY = "SELECT * FROM {table} ORDER BY {p}_last_update DESC LIMIT 1"
+
+TABLES = [("logged_entry", "le"), ("activity_entry", "ae")]
+
+
+def run_queries(conn: sqlite3.Connection, query: str, days):
+    results = []
+    start = time.perf_counter()
+    for day in days:
+        results.append(conn.execute(query, {"from_date": int(day.timestamp()),
+                                            "to_date": int((day + datetime.timedelta(days=1)).timestamp())}).fetchall())
+    return (time.perf_counter() - start) / len(days) * 1000, results
+
+
+def time_latest_query(conn: sqlite3.Connection, query: str, count: int = 100) -> float:
+    start = time.perf_counter()
+    for _ in range(count):
+        conn.execute(query).fetchone()
+    return (time.perf_counter() - start) / count * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--years", type=int, default=3)
+    parser.add_argument("--days", type=int, default=500)
+    args = parser.parse_args()
+
+    database_file_path = synthetic_database.use_temporary_userdata_path()
+    synthetic_database.create(path=database_file_path, years=args.years)
+    days = synthetic_database.get_days(years=args.years, count=args.days)
+
+    conn = sqlite3.connect(database_file_path)
+    conn.row_factory = sqlite3.Row
+    for table, _ in TABLES:
+        print(f"{table}: {conn.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]} rows")
+
+    old_results = {}
+    for table, p in TABLES:
+        query = OLD_QUERY.format(table=table, p=p)
+        milliseconds, old_results[table] = run_queries(conn=conn, query=query, days=days)
+        print(f"before {table}: {milliseconds:.2f} ms per day,"
+              f" latest entry {time_latest_query(conn, OLD_LATEST_QUERY.format(table=table, p=p)):.3f} ms")
+
+    size_before = os.path.getsize(database_file_path)
+    start = time.perf_counter()
+    database_helper._update_if_needed(conn=conn)
+    print(f"migration: {time.perf_counter() - start:.2f} s,"
+          f" {size_before / 1e6:.0f} -> {os.path.getsize(database_file_path) / 1e6:.0f} MB")
+
+    for table, p in TABLES:
+        query = NEW_QUERY.format(table=table, p=p)
+        milliseconds, new_results = run_queries(conn=conn, query=query, days=days)
+        print(f"after {table}: {milliseconds:.2f} ms per day,"
+              f" latest entry {time_latest_query(conn, NEW_LATEST_QUERY.format(table=table, p=p)):.3f} ms,"
+              f" same results: {[list(map(tuple, r)) for r in new_results] == [list(map(tuple, r)) for r in old_results[table]]}")
+        plan = [row["detail"] for row in conn.execute("EXPLAIN QUERY PLAN " + query, {"from_date": 0, "to_date": 0})]
+        print(f"  plan: {'; '.join(plan)}")
+
+    conn.close()
+    shutil.rmtree(os.path.dirname(database_file_path))
+
+
+if __name__ == "__main__":
+    main()
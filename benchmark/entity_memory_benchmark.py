@@ -0,0 +1,56 @@
+# Measures the memory of a month of entries loaded into the timeline on a synthetic database,
+# both for the entities of the repositories and for the timeline columns built from them.
+# Run from the repository root: python3 -m benchmark.entity_memory_benchmark [--years 1] [--days 30]
+import argparse
+import datetime
+import gc
+import os
+import shutil
+import tracemalloc
+
+from benchmark import synthetic_database
+from mtag.helper import database_helper, timeline_column_helper
+from mtag.repository import ActivityEntryRepository, LoggedEntryRepository, TaggedEntryRepository
+
+
+KINDS = [("logged entries", LoggedEntryRepository, timeline_column_helper.from_logged_entries),
+         ("activity entries", ActivityEntryRepository, timeline_column_helper.from_activity_entries),
+         ("tagged entries", TaggedEntryRepository, timeline_column_helper.from_tagged_entries)]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--years", type=int, default=1)
+    parser.add_argument("--days", type=int, default=30)
+    args = parser.parse_args()
+
+    database_file_path = synthetic_database.use_temporary_userdata_path()
+    synthetic_database.create(path=database_file_path, years=args.years)
+    database_helper.create_connection().close()
+    conn = database_helper.open_read_only_connection()
+    days = [synthetic_database.START + datetime.timedelta(days=60 + i) for i in range(args.days)]
+
+    for name, repository_class, to_columns in KINDS:
+        # The timeline loads and keeps the entries day by day, which is what is measured here
+        gc.collect()
+        tracemalloc.start()
+        entries_by_day = [repository_class().get_all_in_range(conn=conn, from_datetime=day,
+                                                               to_datetime=day + datetime.timedelta(days=1))
+                          for day in days]
+        entity_bytes = tracemalloc.get_traced_memory()[0]
+        columns_by_day = [to_columns(entries) for entries in entries_by_day]
+        column_bytes = tracemalloc.get_traced_memory()[0] - entity_bytes
+        tracemalloc.stop()
+
+        entry_count = max(sum(len(entries) for entries in entries_by_day), 1)
+        print(f"{name}: {entry_count} in {args.days} days, {(entity_bytes + column_bytes) / 2 ** 20:.1f} MiB,"
+              f" {entity_bytes / entry_count:.0f} bytes per entity,"
+              f" {column_bytes / entry_count:.0f} bytes per entry in the timeline columns")
+        del entries_by_day, columns_by_day
+
+    conn.close()
+    shutil.rmtree(os.path.dirname(database_file_path))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,26 @@
+/* Counts the fsync and fdatasync calls of a process, for benchmark/watcher_tick_benchmark.py.
+ * Build: cc -shared -fPIC -o /tmp/libfsync_count.so benchmark/fsync_count.c -ldl
+ * Use:   LD_PRELOAD=/tmp/libfsync_count.so python3 -m benchmark.watcher_tick_benchmark
+ */
+#define _GNU_SOURCE
+#include <dlfcn.h>
+
+static long fsync_count = 0;
+
+int fsync(int fd) {
+    static int (*real_fsync)(int) = 0;
+    if (!real_fsync) real_fsync = dlsym(RTLD_NEXT, "fsync");
+    fsync_count++;
+    return real_fsync(fd);
+}
+
+int fdatasync(int fd) {
+    static int (*real_fdatasync)(int) = 0;
+    if (!real_fdatasync) real_fdatasync = dlsym(RTLD_NEXT, "fdatasync");
+    fsync_count++;
+    return real_fdatasync(fd);
+}
+
+long mtag_fsync_count(void) {
+    return fsync_count;
+}
@@ -0,0 +1,102 @@
+# Compares the old "start or end in the day" queries with the overlap queries of get_all_in_range
+# on a synthetic database, and checks both against a brute-force overlap scan.
+# Run from the repository root: python3 -m benchmark.range_query_benchmark [--years 3] [--days 500]
+import argparse
+import datetime
+import os
+import shutil
+import sqlite3
+import time
+
+from benchmark import synthetic_database
+from mtag.helper import database_helper
+from mtag.repository import LoggedEntryRepository, TaggedEntryRepository, ActivityEntryRepository
+
+
+# The queries of get_all_by_date before get_all_in_range
+OLD_QUERY = ("SELECT {p}_id FROM {table} WHERE"
+             " (:from_date <= {end} AND {end} < :to_date)"
+             " OR"
+             " (:from_date <= {p}_start AND {p}_start < :to_date)"
+             " ORDER BY {p}_start ASC")
+
+# The predicates of get_all_in_range. Only the logged and activity entries never overlap,
+# which lets their scan of the start index be bounded from below.
+NEW_QUERY = ("SELECT {p}_id FROM {table}"
+             " WHERE {p}_start >= IFNULL((SELECT MAX({p}_start) FROM {table}"
+             "                           WHERE {p}_start < :from_date), :from_date)"
+             " AND {p}_start < :to_date"
+             " AND {end} > :from_date"
+             " ORDER BY {p}_start ASC")
+
+NEW_OVERLAPPING_QUERY = "SELECT {p}_id FROM {table} WHERE {p}_start < :to_date AND {end} > :from_date ORDER BY {p}_start ASC"
+
+BRUTE_FORCE_QUERY = "SELECT {p}_id FROM {table} NOT INDEXED WHERE {p}_start < :to_date AND {end} > :from_date ORDER BY {p}_start ASC"
+
+TABLES = [("logged_entry", "le", "le_last_update", NEW_QUERY, LoggedEntryRepository),
+          ("activity_entry", "ae", "ae_last_update", NEW_QUERY, ActivityEntryRepository),
+          ("tagged_entry", "te", "te_end", NEW_OVERLAPPING_QUERY, TaggedEntryRepository)]
+
+
+def get_parameters(day: datetime.datetime):
+    return {"from_date": int(day.timestamp()), "to_date": int((day + datetime.timedelta(days=1)).timestamp())}
+
+
+def run_queries(conn: sqlite3.Connection, query: str, days):
+    start = time.perf_counter()
+    results = [conn.execute(query, get_parameters(day)).fetchall() for day in days]
+    return (time.perf_counter() - start) / len(days) * 1000, [[row[0] for row in rows] for rows in results]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--years", type=int, default=3)
+    parser.add_argument("--days", type=int, default=500)
+    args = parser.parse_args()
+
+    database_file_path = synthetic_database.use_temporary_userdata_path()
+    synthetic_database.create(path=database_file_path, years=args.years)
+    database_helper.create_connection().close()
+    conn = database_helper.open_read_only_connection()
+
+    # Include the days which are fully covered by the multi-day tagged entry
+    te_start, te_end = conn.execute("SELECT te_start, te_end FROM tagged_entry"
+                                    " ORDER BY te_end - te_start DESC LIMIT 1").fetchone()
+    first_covered_day = datetime.datetime.fromtimestamp(te_start).replace(hour=0, minute=0, second=0)
+    covered_days = []
+    day = first_covered_day + datetime.timedelta(days=1)
+    while day + datetime.timedelta(days=1) <= datetime.datetime.fromtimestamp(te_end):
+        covered_days.append(day)
+        day += datetime.timedelta(days=1)
+    days = synthetic_database.get_days(years=args.years, count=args.days) + covered_days
+
+    for table, p, end, new_query, repository_class in TABLES:
+        row_count = conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+        old_milliseconds, old_results = run_queries(conn, OLD_QUERY.format(table=table, p=p, end=end), days)
+        new_milliseconds, new_results = run_queries(conn, new_query.format(table=table, p=p, end=end), days)
+
+        # The brute-force scan is slow, so only a sample and the covered days are checked
+        checked_days = days[::25] + covered_days
+        _, brute_force_results = run_queries(conn, BRUTE_FORCE_QUERY.format(table=table, p=p, end=end), checked_days)
+        matches = all(brute_force_result == new_results[days.index(day)]
+                      for day, brute_force_result in zip(checked_days, brute_force_results))
+        missed_days = sum(1 for old_result, new_result in zip(old_results, new_results)
+                          if set(new_result) - set(old_result))
+
+        repository = repository_class()
+        start = time.perf_counter()
+        for day in days:
+            repository.get_all_in_range(conn=conn, from_datetime=day, to_datetime=day + datetime.timedelta(days=1))
+        repository_milliseconds = (time.perf_counter() - start) / len(days) * 1000
+
+        print(f"{table} ({row_count} rows): old {old_milliseconds:.3f} ms, new {new_milliseconds:.3f} ms per day,"
+              f" get_all_in_range with entities {repository_milliseconds:.3f} ms per day")
+        print(f"  new matches the brute-force overlap scan: {matches},"
+              f" days where the old query missed entries: {missed_days}")
+
+    conn.close()
+    shutil.rmtree(os.path.dirname(database_file_path))
+
+
+if __name__ == "__main__":
+    main()
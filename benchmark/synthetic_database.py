@@ -0,0 +1,66 @@
+import datetime
+import os
+import random
+import sqlite3
+import tempfile
+
+from mtag.helper import database_helper, filesystem_helper
+
+
+START = datetime.datetime(2020, 1, 1)
+APPLICATION_WINDOW_COUNT = 200
+
+
+def use_temporary_userdata_path() -> str:
+    # Keeps the benchmarks away from the real database and its backups
+    userdata_path = tempfile.mkdtemp(prefix="mtag-benchmark-")
+    filesystem_helper.user_data_path = userdata_path
+    filesystem_helper.user_data_backup_path = os.path.join(userdata_path, "backup")
+    os.makedirs(filesystem_helper.user_data_backup_path)
+    return os.path.join(userdata_path, "mtag.db")
+
+
+def get_days(years: int, count: int, seed: int = 2):
+    rnd = random.Random(seed)
+    return [START + datetime.timedelta(days=rnd.randint(0, years * 365 - 1)) for _ in range(count)]
+
+
+def create(path: str, years: int, seed: int = 1) -> None:
+    # Samples every two seconds around the clock, where a window is kept for up to a minute
+    # and the activity state for up to ten minutes. That is about 650k logged entries a year.
+    conn = sqlite3.connect(path)
+    schema_file_path = os.path.join(os.path.dirname(database_helper.__file__), "schema.sql")
+    with open(file=schema_file_path, mode="rt") as schema_file:
+        conn.executescript(schema_file.read())
+
+    rnd = random.Random(seed)
+    start_timestamp = int(START.timestamp())
+    end_timestamp = start_timestamp + years * 365 * 86400
+
+    def generate_periods(max_duration: int, max_gap: int):
+        timestamp = start_timestamp
+        while timestamp < end_timestamp:
+            duration = rnd.randint(2, max_duration)
+            yield timestamp, timestamp + duration
+            timestamp += duration + (rnd.randint(60, max_gap) if rnd.random() < 0.01 else 0)
+
+    conn.execute("INSERT INTO application_path(ap_path) VALUES ('/usr/bin/benchmark')")
+    conn.execute("INSERT INTO application(a_name, a_path_id) VALUES ('benchmark', 1)")
+    conn.executemany("INSERT INTO application_window(aw_title, aw_application_id) VALUES (?, 1)",
+                     [(f"Window {i}",) for i in range(APPLICATION_WINDOW_COUNT)])
+    conn.executemany("INSERT INTO logged_entry(le_application_window_id, le_start, le_last_update) VALUES (?, ?, ?)",
+                     ((rnd.randint(1, APPLICATION_WINDOW_COUNT), start, stop)
+                      for start, stop in generate_periods(max_duration=60, max_gap=3600)))
+    conn.executemany("INSERT INTO activity_entry(ae_start, ae_last_update, ae_active) VALUES (?, ?, ?)",
+                     ((start, stop, rnd.randint(0, 1))
+                      for start, stop in generate_periods(max_duration=600, max_gap=3600)))
+
+    # Tagged entries are longer and have gaps between them, and one spans several days
+    conn.execute("INSERT INTO category(c_name) VALUES ('Benchmark')")
+    conn.executemany("INSERT INTO tagged_entry(te_category_id, te_start, te_end) VALUES (1, ?, ?)",
+                     generate_periods(max_duration=7200, max_gap=7200))
+    tag_start = int((START + datetime.timedelta(days=years * 365 + 31)).timestamp())
+    conn.execute("INSERT INTO tagged_entry(te_category_id, te_start, te_end) VALUES (1, ?, ?)",
+                 (tag_start, tag_start + 4 * 86400))
+    conn.commit()
+    conn.close()
@@ -0,0 +1,131 @@
+# Measures the latency and the system calls of watcher ticks, by calling watcher_helper.register()
+# with a fake clock advancing two seconds per tick, both for a steady window and while switching.
+# Run from the repository root: python3 -m benchmark.watcher_tick_benchmark [--ticks 200]
+# Compare with an older version with --source <checkout>, e.g. one made by git worktree add.
+# The read/write system calls are read from /proc/self/io, so they are only counted on Linux.
+# The fsyncs are counted when benchmark/fsync_count.c is preloaded, see that file, and the commits
+# are counted for the versions that keep a connection in the watcher session.
+import argparse
+import collections
+import ctypes
+import datetime
+import inspect
+import json
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import time
+import types
+
+
+class FakeDatetime(datetime.datetime):
+    current = datetime.datetime(2020, 1, 1, 8)
+
+    @classmethod
+    def now(cls, tz=None):
+        cls.current += datetime.timedelta(seconds=2)
+        return datetime.datetime.fromtimestamp(cls.current.timestamp())
+
+
+def get_fsync_count() -> int:
+    try:
+        return ctypes.CDLL(None).mtag_fsync_count()
+    except AttributeError:
+        return -1
+
+
+def get_read_write_count() -> int:
+    try:
+        with open("/proc/self/io") as io_file:
+            io = dict(line.split(": ") for line in io_file.read().splitlines())
+    except OSError:
+        return -1
+    return int(io["syscr"]) + int(io["syscw"])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--ticks", type=int, default=200)
+    parser.add_argument("--write-behind-seconds", type=int, default=0)
+    parser.add_argument("--source", help="the checkout of mtag to measure, by default this one")
+    args = parser.parse_args()
+
+    temporary_path = tempfile.mkdtemp(prefix="mtag-benchmark-")
+    os.environ["HOME"] = temporary_path
+    os.environ["XDG_DATA_HOME"] = os.path.join(temporary_path, "data")
+    os.environ["XDG_CONFIG_HOME"] = os.path.join(temporary_path, "config")
+    os.makedirs(os.path.join(os.environ["XDG_CONFIG_HOME"], "mtag"))
+    os.makedirs(os.environ["XDG_DATA_HOME"])
+    # Older versions don't know the write-behind setting, so it's only written when asked for
+    if args.write_behind_seconds > 0:
+        with open(os.path.join(os.environ["XDG_CONFIG_HOME"], "mtag", "configuration.json"),
+                  "w") as configuration_file:
+            json.dump({"write_behind_seconds": args.write_behind_seconds}, configuration_file)
+
+    if args.source is not None:
+        sys.path.insert(0, os.path.abspath(args.source))
+    from mtag.watcher import watcher_helper
+    logging.getLogger().setLevel(logging.WARNING)
+    watcher_helper.datetime = types.SimpleNamespace(datetime=FakeDatetime, timedelta=datetime.timedelta,
+                                                    date=datetime.date)
+
+    # Older versions of register() didn't take a session
+    session = None
+    if "session" in inspect.signature(watcher_helper.register).parameters:
+        from mtag.watcher.watcher_session import WatcherSession
+        session = WatcherSession()
+
+    events = collections.Counter()
+
+    def count_event(name, _):
+        if name in ("open", "os.listdir", "os.scandir", "sqlite3.connect", "subprocess.Popen"):
+            events[name] += 1
+    sys.addaudithook(count_event)
+
+    def tick(window_title: str) -> None:
+        arguments = dict(window_title=window_title, application_name="benchmark",
+                         application_path="/usr/bin/benchmark", idle_period=0)
+        if session is not None:
+            watcher_helper.register(session, **arguments)
+        else:
+            watcher_helper.register(**arguments)
+
+    tick("Warm-up")
+    if session is not None:
+        journal_mode = session.get_connection().execute("PRAGMA journal_mode").fetchone()[0]
+        print(f"journal mode {journal_mode}, write-behind {args.write_behind_seconds} s")
+
+        # Each commit costs the fsyncs of the journal, so the transactions per tick are counted too
+        def count_statement(statement):
+            if statement.upper().startswith("COMMIT"):
+                events["commit"] += 1
+        session.get_connection().set_trace_callback(count_statement)
+
+    for name, window_titles in (("steady", ["Window"] * args.ticks),
+                                ("switching", [f"Window {i % 7}" for i in range(args.ticks)])):
+        fsync_count = get_fsync_count()
+        read_write_count = get_read_write_count()
+        events.clear()
+        start = time.perf_counter()
+        for window_title in window_titles:
+            tick(window_title)
+        counted_events = dict(events)
+        milliseconds = (time.perf_counter() - start) / args.ticks * 1000
+        read_writes = (get_read_write_count() - read_write_count) / args.ticks
+        fsyncs = (get_fsync_count() - fsync_count) / args.ticks if fsync_count >= 0 else float("nan")
+        print(", ".join([f"{name}: {milliseconds:.3f} ms", f"{read_writes:.1f} read/write syscalls",
+                         f"{fsyncs:.2f} fsyncs per tick"]
+                        + [f"{event} {count / args.ticks:.1f}" for event, count in sorted(counted_events.items())]))
+
+    if session is not None:
+        if hasattr(watcher_helper, "flush_pending_updates"):
+            watcher_helper.flush_pending_updates(session)
+        if hasattr(session, "close"):
+            session.close()
+    shutil.rmtree(temporary_path)
+
+
+if __name__ == "__main__":
+    main()
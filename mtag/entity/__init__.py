@@ -4,4 +4,5 @@ from .application_window import ApplicationWindow
 from .category import Category
 from .tagged_entry import TaggedEntry
 from .logged_entry import LoggedEntry
+from .open_logged_entry import OpenLoggedEntry
 from .activity_entry import ActivityEntry
@@ -1,11 +1,49 @@
 import datetime
 from typing import Optional
 
+from mtag.helper import datetime_helper
+
 
 class ActivityEntry:
+    # Stored like the logged entries, see LoggedEntry
+    __slots__ = ("db_id", "active", "start_timestamp", "stop_timestamp", "_start", "_stop")
+
     def __init__(self, active: bool, start: datetime.datetime, stop: datetime.datetime, db_id: Optional[int] = None):
         self.db_id = db_id
         self.active = active
-        self.start = start
-        self.stop = stop
-        self.duration = stop - start
+        self.start_timestamp = datetime_helper.datetime_to_timestamp(start)
+        self.stop_timestamp = datetime_helper.datetime_to_timestamp(stop)
+        self._start: Optional[datetime.datetime] = None
+        self._stop: Optional[datetime.datetime] = None
+
+    @staticmethod
+    def from_timestamps(active: bool, start_timestamp: int, stop_timestamp: int, db_id: int) -> "ActivityEntry":
+        activity_entry = ActivityEntry.__new__(ActivityEntry)
+        activity_entry.db_id = db_id
+        activity_entry.active = active
+        activity_entry.start_timestamp = start_timestamp
+        activity_entry.stop_timestamp = stop_timestamp
+        activity_entry._start = None
+        activity_entry._stop = None
+        return activity_entry
+
+    @property
+    def start(self) -> datetime.datetime:
+        if self._start is None:
+            self._start = datetime_helper.timestamp_to_datetime(self.start_timestamp)
+        return self._start
+
+    @property
+    def stop(self) -> datetime.datetime:
+        if self._stop is None:
+            self._stop = datetime_helper.timestamp_to_datetime(self.stop_timestamp)
+        return self._stop
+
+    @stop.setter
+    def stop(self, value: datetime.datetime) -> None:
+        self.stop_timestamp = datetime_helper.datetime_to_timestamp(value)
+        self._stop = None
+
+    @property
+    def duration(self) -> datetime.timedelta:
+        return datetime.timedelta(seconds=self.stop_timestamp - self.start_timestamp)
@@ -2,6 +2,8 @@ from mtag.entity import ApplicationPath
 
 
 class Application:
+    __slots__ = ("db_id", "application_path", "name")
+
     def __init__(self, name: str, application_path: ApplicationPath, db_id: int):
         self.db_id = db_id
         self.application_path = application_path
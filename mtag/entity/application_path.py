@@ -1,4 +1,6 @@
 class ApplicationPath:
+    __slots__ = ("db_id", "path")
+
     def __init__(self, path: str, db_id: int):
         self.db_id = db_id
         self.path = path
@@ -2,6 +2,8 @@ from mtag.entity import Application
 
 
 class ApplicationWindow:
+    __slots__ = ("title", "application", "db_id")
+
     def __init__(self, title: str, application: Application, db_id: int = None):
         self.title = title
         self.application = application
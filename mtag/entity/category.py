@@ -2,6 +2,8 @@ from typing import Optional
 
 
 class Category:
+    __slots__ = ("db_id", "name", "url", "parent_id")
+
     def __init__(self, name: str, url: Optional[str] = None, db_id: Optional[int] = None, parent_id: Optional[int] = None):
         self.db_id = db_id
         self.name = name
@@ -1,11 +1,52 @@
 import datetime
+from typing import Optional
+
 from mtag.entity import ApplicationWindow
+from mtag.helper import datetime_helper
 
 
 class LoggedEntry:
+    # Many entries are loaded at once, so they are kept small. The times are stored
+    # as timestamps, and only turned into datetimes when they are asked for.
+    __slots__ = ("db_id", "start_timestamp", "stop_timestamp", "application_window", "_start", "_stop")
+
     def __init__(self, start: datetime, stop: datetime, application_window: ApplicationWindow, db_id: int = None):
         self.db_id = db_id
-        self.start = start
-        self.stop = stop
+        self.start_timestamp = datetime_helper.datetime_to_timestamp(start)
+        self.stop_timestamp = datetime_helper.datetime_to_timestamp(stop)
         self.application_window = application_window
-        self.duration = stop - start
+        self._start: Optional[datetime.datetime] = None
+        self._stop: Optional[datetime.datetime] = None
+
+    @staticmethod
+    def from_timestamps(start_timestamp: int, stop_timestamp: int, application_window: ApplicationWindow,
+                        db_id: int) -> "LoggedEntry":
+        logged_entry = LoggedEntry.__new__(LoggedEntry)
+        logged_entry.db_id = db_id
+        logged_entry.start_timestamp = start_timestamp
+        logged_entry.stop_timestamp = stop_timestamp
+        logged_entry.application_window = application_window
+        logged_entry._start = None
+        logged_entry._stop = None
+        return logged_entry
+
+    @property
+    def start(self) -> datetime.datetime:
+        if self._start is None:
+            self._start = datetime_helper.timestamp_to_datetime(self.start_timestamp)
+        return self._start
+
+    @property
+    def stop(self) -> datetime.datetime:
+        if self._stop is None:
+            self._stop = datetime_helper.timestamp_to_datetime(self.stop_timestamp)
+        return self._stop
+
+    @stop.setter
+    def stop(self, value: datetime.datetime) -> None:
+        self.stop_timestamp = datetime_helper.datetime_to_timestamp(value)
+        self._stop = None
+
+    @property
+    def duration(self) -> datetime.timedelta:
+        return datetime.timedelta(seconds=self.stop_timestamp - self.start_timestamp)
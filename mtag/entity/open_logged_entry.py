@@ -0,0 +1,10 @@
+import datetime
+
+
+class OpenLoggedEntry:
+    __slots__ = ("db_id", "application_window_id", "stop")
+
+    def __init__(self, db_id: int, application_window_id: int, stop: datetime.datetime):
+        self.db_id = db_id
+        self.application_window_id = application_window_id
+        self.stop = stop
@@ -4,6 +4,8 @@ from mtag.entity import Category
 
 
 class TaggedEntry:
+    __slots__ = ("db_id", "start", "_stop", "initial_position", "category", "category_str")
+
     def __init__(self, start: datetime, stop: datetime, category: Optional[Category], category_str: Optional[str] = None, db_id: int = None):
         self.db_id = db_id
         self.start = start
@@ -0,0 +1,57 @@
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+
+
+class LruCache:
+    # The caches are shared with the day loading thread, so they are guarded by a lock.
+    # The max size is a number of entries, or their total size if get_size is given.
+    def __init__(self, max_size: int, get_size: Optional[Callable[[Any], int]] = None):
+        self.max_size = max_size
+        self._get_size = get_size
+        self._size = 0
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _size_of(self, value: Any) -> int:
+        return 1 if self._get_size is None else self._get_size(value)
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            # Mark the entry as the most recently used one
+            try:
+                self._entries.move_to_end(key)
+            except KeyError:
+                return None
+            return self._entries[key]
+
+    def put(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            if key in self._entries:
+                self._size -= self._size_of(self._entries[key])
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            self._size += self._size_of(value)
+
+            # Evict the least recently used entries, but always keep the new one
+            while self._size > self.max_size and len(self._entries) > 1:
+                _, evicted_value = self._entries.popitem(last=False)
+                self._size -= self._size_of(evicted_value)
+
+    def invalidate(self, key: Hashable) -> None:
+        with self._lock:
+            if key in self._entries:
+                self._size -= self._size_of(self._entries.pop(key))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            return key in self._entries
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
@@ -0,0 +1,34 @@
+import sqlite3
+from typing import Optional
+
+from mtag.helper import database_helper
+
+
+class ChangeFeed:
+    # Tells whether another connection, such as the watcher's, has written to the database
+    # since the previous check. SQLite bumps PRAGMA data_version of a connection whenever
+    # another connection commits, which only needs a look at the database header.
+    def __init__(self):
+        self._connection: Optional[sqlite3.Connection] = None
+        self._data_version: Optional[int] = None
+        self._reconnecting = False
+
+    def has_changed(self) -> bool:
+        try:
+            if self._connection is None:
+                self._connection = database_helper.open_read_only_connection()
+
+            data_version = self._connection.execute("PRAGMA data_version").fetchone()[0]
+        except sqlite3.Error:
+            # Reconnect on the next check. The data versions of another connection can't be
+            # compared with the previous ones, so the next check reports a change.
+            if self._connection is not None:
+                self._connection.close()
+            self._connection = None
+            self._reconnecting = True
+            raise
+
+        has_changed = self._reconnecting or (self._data_version is not None and data_version != self._data_version)
+        self._reconnecting = False
+        self._data_version = data_version
+        return has_changed
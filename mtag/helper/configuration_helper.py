@@ -1,6 +1,6 @@
 import json
 import os
-from typing import Dict
+from typing import Dict, Optional, Tuple
 
 from mtag.helper import filesystem_helper
 
@@ -9,24 +9,43 @@ class Configuration:
     default_configuration = {
         "seconds_before_new_entry": 10,
         "inactive_after_idle_seconds": 600,
-        "log_application_path": False
+        "log_application_path": False,
+        "write_behind_seconds": 0,
+        "min_sampling_interval_seconds": 2,
+        "max_sampling_interval_seconds": 5
     }
 
-    def __init__(self, inactive_after_idle_seconds: int, seconds_before_new_entry: int, log_application_path: bool):
+    def __init__(self, inactive_after_idle_seconds: int, seconds_before_new_entry: int, log_application_path: bool,
+                 write_behind_seconds: int, min_sampling_interval_seconds: int, max_sampling_interval_seconds: int):
         self.inactive_after_idle_seconds = inactive_after_idle_seconds
         self.seconds_before_new_entry = seconds_before_new_entry
         self.log_application_path = log_application_path
+        self.write_behind_seconds = write_behind_seconds
+        self.min_sampling_interval_seconds = min_sampling_interval_seconds
+        self.max_sampling_interval_seconds = max_sampling_interval_seconds
 
     def asdict(self) -> Dict:
         d = {k: self.__getattribute__(k) for k, v in Configuration.default_configuration.items()}
         return d
 
 
+# The latest read configuration, and the identity of the file it was read from
+cached_configuration: Optional[Configuration] = None
+cached_configuration_file_key: Optional[Tuple[int, int, int]] = None
+
+
 def get_configuration() -> Configuration:
+    global cached_configuration, cached_configuration_file_key
     configuration_path = get_configuration_path()
     if not os.path.exists(configuration_path):
         save_configuration(Configuration.default_configuration)
 
+    # Only read the file again if it has been changed or replaced since the last time
+    stat_result = os.stat(configuration_path)
+    file_key = (stat_result.st_mtime_ns, stat_result.st_ino, stat_result.st_size)
+    if cached_configuration is not None and file_key == cached_configuration_file_key:
+        return cached_configuration
+
     with open(configuration_path, "r") as config_file:
         read_configuration = json.load(fp=config_file)
 
@@ -34,12 +53,21 @@ def get_configuration() -> Configuration:
         if k not in read_configuration:
             read_configuration[k] = v
 
-    return Configuration(**read_configuration)
+    cached_configuration = Configuration(**read_configuration)
+    cached_configuration_file_key = file_key
+    return cached_configuration
+
+
+def invalidate_configuration() -> None:
+    global cached_configuration, cached_configuration_file_key
+    cached_configuration = None
+    cached_configuration_file_key = None
 
 
 def save_configuration(configuration):
     with open(get_configuration_path(), "w") as config_file:
         json.dump(configuration, fp=config_file, indent=2)
+    invalidate_configuration()
 
 
 def get_configuration_path():
@@ -1,22 +1,48 @@
 import sqlite3
 import os
 import logging
+import pathlib
 from datetime import date
 from mtag.helper import filesystem_helper
 
 
 latest_seen_backup_date = None
 
+# How long a connection waits for the lock of another one, such as the watcher's, before failing
+BUSY_TIMEOUT_SECONDS = 10
+
 
 def create_connection() -> sqlite3.Connection:
-    userdata_path = filesystem_helper.get_userdata_path()
-    database_file_path = os.path.join(userdata_path, "mtag.db")
+    conn = open_connection()
+    run_maintenance(conn=conn)
+    return conn
+
+
+def open_read_only_connection() -> sqlite3.Connection:
+    # The database has to be created, switched to WAL and updated by create_connection first
+    database_uri = pathlib.Path(_get_database_file_path()).as_uri() + "?mode=ro"
+    conn = sqlite3.connect(database_uri, uri=True, detect_types=sqlite3.PARSE_DECLTYPES,
+                           timeout=BUSY_TIMEOUT_SECONDS)
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+def open_connection() -> sqlite3.Connection:
+    database_file_path = _get_database_file_path()
     schema_script_needed = not os.path.exists(database_file_path)
 
-    conn = sqlite3.connect(database_file_path, detect_types=sqlite3.PARSE_DECLTYPES)
+    conn = sqlite3.connect(database_file_path, detect_types=sqlite3.PARSE_DECLTYPES,
+                           timeout=BUSY_TIMEOUT_SECONDS)
     conn.row_factory = sqlite3.Row
     conn.execute("PRAGMA foreign_keys=ON")
 
+    # With the write-ahead log, the readers and the writer don't block each other.
+    # The mode is stored in the database, while the synchronous setting is per connection.
+    # NORMAL only syncs at checkpoints, which can lose the latest commits on a power loss
+    # but never corrupts the database.
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+
     if schema_script_needed:
         logging.info("No database found. Creating it.")
         schema_file_path = os.path.join(os.path.dirname(__file__), "schema.sql")
@@ -26,12 +52,18 @@ def create_connection() -> sqlite3.Connection:
 
         conn.executescript(schema_script)
 
+    return conn
+
+
+def _get_database_file_path() -> str:
+    return os.path.join(filesystem_helper.get_userdata_path(), "mtag.db")
+
+
+def run_maintenance(conn: sqlite3.Connection) -> None:
     _backup_if_needed(conn=conn)
     filesystem_helper.purge_backups_if_needed()
     _update_if_needed(conn=conn)
 
-    return conn
-
 
 def _backup_if_needed(conn: sqlite3.Connection) -> None:
     global latest_seen_backup_date
@@ -144,3 +176,23 @@ INSERT INTO new_category(c_id, c_name, c_url)
         conn.isolation_level = old_isolation_level
         logging.info("Database updated to version 2")
 
+    if database_version < 3:
+        cursor = conn.cursor()
+
+        # The GUI threads and the watcher may be updating the database at the same time,
+        # so the version is checked again once the write lock is held
+        cursor.execute("BEGIN IMMEDIATE")
+        cursor.execute("SELECT MAX(v_version) AS current_version FROM version")
+        if cursor.fetchone()["current_version"] < 3:
+            logging.info("Updating database to version 3")
+
+            # Covering indexes for the range queries. Entries of the same kind never overlap,
+            # so a date range can be found by scanning the start column only.
+            cursor.execute("CREATE INDEX IF NOT EXISTS logged_entry_start_idx"
+                           " ON logged_entry(le_start, le_last_update, le_application_window_id)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS activity_entry_start_idx"
+                           " ON activity_entry(ae_start, ae_last_update, ae_active)")
+            cursor.execute("INSERT INTO version VALUES (3)")
+            logging.info("Database updated to version 3")
+        conn.commit()
+
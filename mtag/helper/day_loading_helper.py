@@ -0,0 +1,236 @@
+import datetime
+import itertools
+import logging
+import queue
+import sqlite3
+import threading
+from collections import namedtuple
+from typing import Callable, List, Optional
+
+from gi.repository import GLib
+
+from mtag.helper import database_helper
+from mtag.helper.cache_helper import LruCache
+from mtag.repository import LoggedEntryRepository, TaggedEntryRepository, ActivityEntryRepository
+
+
+DayEntries = namedtuple("DayEntries", ["date", "logged_entries", "tagged_entries", "activity_entries"])
+# The entries which are new or extended since the previous delivery of the day
+DayChanges = namedtuple("DayChanges", ["day_entries", "logged_entries", "activity_entries"])
+CachedDay = namedtuple("CachedDay", ["data_version", "day_entries"])
+
+# The requested days are loaded before the refreshes, and those before the prefetched days
+LOAD_PRIORITY = 0
+REFRESH_PRIORITY = 1
+PREFETCH_PRIORITY = 2
+
+
+def _count_entries(cached_day: CachedDay) -> int:
+    day_entries = cached_day.day_entries
+    return len(day_entries.logged_entries) + len(day_entries.tagged_entries) + len(day_entries.activity_entries)
+
+
+def _to_day(date: datetime.datetime) -> datetime.datetime:
+    return datetime.datetime(year=date.year, month=date.month, day=date.day)
+
+
+def _merge_changes(entries: List, changed_entries: List) -> List:
+    # A new list is created, since the old one may still be used by the main thread
+    merged_entries = entries.copy()
+    for changed_entry in changed_entries:
+        if merged_entries and merged_entries[-1].db_id == changed_entry.db_id:
+            merged_entries[-1] = changed_entry
+        else:
+            merged_entries.append(changed_entry)
+    return merged_entries
+
+
+class DayLoader:
+    # Loads the entries of days on a worker thread with its own database connection.
+    # Only the latest requested day is delivered, on the main loop, and older requests
+    # are dropped as soon as they are noticed to be outdated.
+    MAX_CACHED_ENTRIES = 250000
+
+    def __init__(self, on_loaded: Callable[[DayEntries], None], on_refreshed: Callable[[DayChanges], None]):
+        self._on_loaded = on_loaded
+        self._on_refreshed = on_refreshed
+        self._requests = queue.PriorityQueue()
+        self._request_order = itertools.count()
+        self._generation = 0
+        self._generation_lock = threading.Lock()
+        self._requested_day: Optional[datetime.datetime] = None
+
+        # The loaded days, together with the database's data version when they were loaded
+        self._day_cache = LruCache(max_size=DayLoader.MAX_CACHED_ENTRIES, get_size=_count_entries)
+        self._invalidations = 0
+
+        self._thread = threading.Thread(target=self._run, name="mtag-day-loader", daemon=True)
+        self._thread.start()
+
+    def request(self, date: datetime.datetime) -> None:
+        day = _to_day(date)
+        with self._generation_lock:
+            self._generation += 1
+            generation = self._generation
+            self._requested_day = day
+
+        # The days which the watcher may still be writing to have to be checked by the worker
+        cached_day = self._day_cache.get(day)
+        if cached_day is not None and not DayLoader._is_live(day):
+            self._on_loaded(cached_day.day_entries)
+            self._prefetch_neighbours(day)
+            return
+
+        self._requests.put((LOAD_PRIORITY, next(self._request_order), generation, day))
+
+    def refresh(self, date: datetime.datetime) -> None:
+        # Only the days which the watcher may still be writing to can change by themselves
+        day = _to_day(date)
+        if day == self._requested_day and DayLoader._is_live(day):
+            self._requests.put((REFRESH_PRIORITY, next(self._request_order), self._generation, day))
+
+    def invalidate(self, from_datetime: datetime.datetime, to_datetime: datetime.datetime) -> None:
+        self._invalidations += 1
+        day = _to_day(from_datetime)
+        while day <= to_datetime:
+            self._day_cache.invalidate(day)
+            day += datetime.timedelta(days=1)
+
+    def invalidate_all(self) -> None:
+        self._invalidations += 1
+        self._day_cache.clear()
+
+    @staticmethod
+    def _is_live(day: datetime.datetime) -> bool:
+        # An entry started yesterday may still be open
+        return datetime.date.today() - datetime.timedelta(days=1) <= day.date()
+
+    def _invalidate_live_days(self) -> None:
+        today = _to_day(datetime.datetime.now())
+        for day in (today - datetime.timedelta(days=1), today):
+            self._day_cache.invalidate(day)
+
+    def _is_current(self, generation: int) -> bool:
+        return generation == self._generation
+
+    def _prefetch_neighbours(self, day: datetime.datetime) -> None:
+        for neighbour in (day + datetime.timedelta(days=1), day - datetime.timedelta(days=1)):
+            if neighbour not in self._day_cache:
+                self._requests.put((PREFETCH_PRIORITY, next(self._request_order), None, neighbour))
+
+    def _run(self) -> None:
+        conn: Optional[sqlite3.Connection] = None
+        while True:
+            priority, _, generation, day = self._requests.get()
+            if priority != PREFETCH_PRIORITY and not self._is_current(generation):
+                continue
+
+            # Only prefetch the days next to the one currently shown
+            if priority == PREFETCH_PRIORITY and (day in self._day_cache
+                                                  or abs(day - self._requested_day) > datetime.timedelta(days=1)):
+                continue
+
+            try:
+                if conn is None:
+                    conn = database_helper.open_read_only_connection()
+                    # The cached data versions are from another connection and can't be compared
+                    # with the ones of this one. Only the live days may have changed meanwhile.
+                    self._invalidate_live_days()
+
+                # Read before the queries, so that changes made during them are noticed the next time
+                data_version = conn.execute("PRAGMA data_version").fetchone()[0]
+                invalidations = self._invalidations
+                cached_day = self._day_cache.get(day)
+                if cached_day is not None and cached_day.data_version == data_version:
+                    if priority == REFRESH_PRIORITY:
+                        continue
+                    day_entries = cached_day.day_entries
+                elif cached_day is not None and priority == REFRESH_PRIORITY:
+                    day_changes = self._load_changes(conn=conn, day_entries=cached_day.day_entries)
+                    if invalidations == self._invalidations:
+                        self._day_cache.put(day, CachedDay(data_version=data_version,
+                                                           day_entries=day_changes.day_entries))
+                    if day_changes.logged_entries or day_changes.activity_entries:
+                        GLib.idle_add(self._deliver_changes, generation, day_changes)
+                    continue
+                else:
+                    day_entries = self._load(conn=conn, generation=generation, day=day)
+                    if day_entries is None:
+                        continue
+
+                    # Don't cache what may have been invalidated during the queries
+                    if invalidations == self._invalidations:
+                        self._day_cache.put(day, CachedDay(data_version=data_version, day_entries=day_entries))
+            except Exception:
+                # Keep the worker alive for the next request, with a new connection
+                logging.exception(f"Failed to load the entries of {day}")
+                if conn is not None:
+                    conn.close()
+                conn = None
+                continue
+
+            # A refreshed day which wasn't cached any more has been loaded completely
+            if priority != PREFETCH_PRIORITY:
+                GLib.idle_add(self._deliver, generation, day_entries)
+                self._prefetch_neighbours(day)
+
+    def _load(self, conn: sqlite3.Connection, generation: Optional[int],
+              day: datetime.datetime) -> Optional[DayEntries]:
+        to_datetime = day + datetime.timedelta(days=1)
+
+        # Give up between the queries if another day has been requested meanwhile.
+        # Prefetches don't have a generation and are always completed.
+        logged_entries = LoggedEntryRepository().get_all_in_range(conn=conn, from_datetime=day,
+                                                                   to_datetime=to_datetime)
+        if generation is not None and not self._is_current(generation):
+            return None
+
+        tagged_entries = TaggedEntryRepository().get_all_in_range(conn=conn, from_datetime=day,
+                                                                  to_datetime=to_datetime)
+        if generation is not None and not self._is_current(generation):
+            return None
+
+        activity_entries = ActivityEntryRepository().get_all_in_range(conn=conn, from_datetime=day,
+                                                                      to_datetime=to_datetime)
+        if generation is not None and not self._is_current(generation):
+            return None
+
+        return DayEntries(date=day, logged_entries=logged_entries, tagged_entries=tagged_entries,
+                          activity_entries=activity_entries)
+
+    @staticmethod
+    def _load_changes(conn: sqlite3.Connection, day_entries: DayEntries) -> DayChanges:
+        from_datetime = day_entries.date
+        to_datetime = from_datetime + datetime.timedelta(days=1)
+
+        # Without a latest entry to start from, the whole day is loaded again
+        if day_entries.logged_entries:
+            logged_entries = LoggedEntryRepository().get_all_changed_since(
+                conn=conn, latest_logged_entry=day_entries.logged_entries[-1], to_datetime=to_datetime)
+        else:
+            logged_entries = LoggedEntryRepository().get_all_in_range(conn=conn, from_datetime=from_datetime,
+                                                                       to_datetime=to_datetime)
+
+        if day_entries.activity_entries:
+            activity_entries = ActivityEntryRepository().get_all_changed_since(
+                conn=conn, latest_activity_entry=day_entries.activity_entries[-1], to_datetime=to_datetime)
+        else:
+            activity_entries = ActivityEntryRepository().get_all_in_range(conn=conn, from_datetime=from_datetime,
+                                                                          to_datetime=to_datetime)
+
+        changed_day_entries = day_entries._replace(
+            logged_entries=_merge_changes(day_entries.logged_entries, logged_entries),
+            activity_entries=_merge_changes(day_entries.activity_entries, activity_entries))
+        return DayChanges(day_entries=changed_day_entries, logged_entries=logged_entries,
+                          activity_entries=activity_entries)
+
+    def _deliver_changes(self, generation: int, day_changes: DayChanges) -> bool:
+        if self._is_current(generation):
+            self._on_refreshed(day_changes)
+        return False
+
+    def _deliver(self, generation: int, day_entries: DayEntries) -> bool:
+        # Another day may have been requested while this one was waiting for the main loop
+        if self._is_current(generation):
+            self._on_loaded(day_entries)
+        return False
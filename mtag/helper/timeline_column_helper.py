@@ -0,0 +1,268 @@
+import math
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import Callable, Dict, Hashable, Iterator, List, Optional, Tuple
+
+from mtag.helper import color_helper, datetime_helper
+from mtag.helper.cache_helper import LruCache
+from mtag.helper.timeline_helper import TimelineHelper
+
+
+class TimelineColumns:
+    # The entries of a timeline stored column by column, so that the viewport
+    # culling and the pixel mapping only need to work on plain integers.
+    def __init__(self):
+        self.entries: List = []
+        self.starts = array("q")
+        self.stops = array("q")
+        # The application window id, the category id or the activity state of each entry
+        self.group_ids = array("q")
+        self.color_indices = array("I")
+        self.colors: List[Tuple[float, float, float]] = []
+        self._color_index_by_key: Dict[Hashable, int] = {}
+
+        # The number of entries stopping before the previous one. Only tagged entries can overlap
+        # like that, and then the stops are not in order and can't be searched.
+        self._unordered_stop_count = 0
+
+        # The pixel positions are only kept for the entries within the viewport
+        self.visible_start = 0
+        self.visible_stop = 0
+        self.start_xs = array("q")
+        self.stop_xs = array("q")
+
+        # The pixel runs by zoom level, see get_pixel_runs
+        self._pixel_runs_cache = LruCache(max_size=8)
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def append(self, entry, start_timestamp: int, stop_timestamp: int, group_id: int,
+               color_key: Hashable, to_color: Callable[[Hashable], Tuple[float, float, float]]) -> None:
+        color_index = self._color_index_by_key.get(color_key)
+        if color_index is None:
+            color_index = len(self.colors)
+            self.colors.append(to_color(color_key))
+            self._color_index_by_key[color_key] = color_index
+
+        if self.stops and stop_timestamp < self.stops[-1]:
+            self._unordered_stop_count += 1
+
+        self.entries.append(entry)
+        self.starts.append(start_timestamp)
+        self.stops.append(stop_timestamp)
+        self.group_ids.append(group_id)
+        self.color_indices.append(color_index)
+
+    def pop(self) -> None:
+        if len(self.stops) > 1 and self.stops[-1] < self.stops[-2]:
+            self._unordered_stop_count -= 1
+
+        self.entries.pop()
+        self.starts.pop()
+        self.stops.pop()
+        self.group_ids.pop()
+        self.color_indices.pop()
+
+    def is_latest_entry(self, entry) -> bool:
+        return len(self.entries) > 0 and self.entries[-1].db_id == entry.db_id
+
+    def clear_pixel_runs(self) -> None:
+        self._pixel_runs_cache.clear()
+
+    def get_color(self, index: int) -> Tuple[float, float, float]:
+        return self.colors[self.color_indices[index]]
+
+    def has_ordered_stops(self) -> bool:
+        return self._unordered_stop_count == 0
+
+    def get_last_stop(self) -> int:
+        return self.stops[-1] if self.has_ordered_stops() else max(self.stops)
+
+    def update_positions(self, timeline_helper: TimelineHelper, from_timestamp: int, to_timestamp: int) -> None:
+        starts = self.starts
+        stops = self.stops
+
+        # The entries are sorted and don't overlap, so both the starts and the stops are
+        # in order and the visible entries are next to each other. Overlapping entries are
+        # kept from the first visible one, which may leave some hidden ones in between.
+        if self.has_ordered_stops():
+            visible_start = bisect_left(stops, from_timestamp)
+        else:
+            visible_start = next((index for index, stop in enumerate(stops) if from_timestamp <= stop), len(stops))
+        visible_stop = max(visible_start, bisect_right(starts, to_timestamp))
+
+        self.visible_start = visible_start
+        self.visible_stop = visible_stop
+
+        start_timestamp = timeline_helper.start_timestamp
+        pixels_per_second = timeline_helper.pixels_per_second
+        side_padding = timeline_helper.timeline_side_padding
+        floor = math.floor
+        ceil = math.ceil
+        self.start_xs = array("q", [floor((start - start_timestamp) * pixels_per_second + side_padding)
+                                    for start in starts[visible_start:visible_stop]])
+        self.stop_xs = array("q", [ceil((stop - start_timestamp) * pixels_per_second + side_padding)
+                                   for stop in stops[visible_start:visible_stop]])
+
+    def get_visible_entries(self) -> List:
+        return self.entries[self.visible_start:self.visible_stop]
+
+    def iter_visible_positions(self) -> Iterator[Tuple[int, int, int]]:
+        return zip(range(self.visible_start, self.visible_stop), self.start_xs, self.stop_xs)
+
+    def find_visible_index_by_x(self, x: float) -> Optional[int]:
+        # Of overlapping entries, the latest one is drawn on top
+        if not self.has_ordered_stops():
+            for visible_index in reversed(range(len(self.stop_xs))):
+                if self.start_xs[visible_index] <= x <= self.stop_xs[visible_index]:
+                    return self.visible_start + visible_index
+            return None
+
+        # The first visible entry which ends at or after x is the only candidate
+        visible_index = bisect_left(self.stop_xs, x)
+        if visible_index == len(self.stop_xs) or x < self.start_xs[visible_index]:
+            return None
+        return self.visible_start + visible_index
+
+    def get_x_positions(self, index: int) -> Tuple[int, int]:
+        visible_index = index - self.visible_start
+        return self.start_xs[visible_index], self.stop_xs[visible_index]
+
+    def get_pixel_runs(self, timeline_helper: TimelineHelper,
+                       from_timestamp: int, to_timestamp: int) -> Iterator[Tuple[int, int, Tuple[float, float, float]]]:
+        # The runs are created for zoom levels in powers of two, where a column is between
+        # one and two pixels wide. They are aligned to the zoom level and not to the viewport,
+        # so that zooming and moving can reuse them as long as the viewport stays within
+        # the entries they were created from.
+        pixels_per_second = timeline_helper.pixels_per_second
+        columns_per_second = 2.0 ** math.floor(math.log2(pixels_per_second))
+        pixel_runs = self._pixel_runs_cache.get(columns_per_second)
+        if pixel_runs is None or not pixel_runs[0] <= self.visible_start or not self.visible_stop <= pixel_runs[1]:
+            # Include the entries of one more viewport on each side
+            margin = max(self.visible_stop - self.visible_start, 1)
+            first_entry = max(self.visible_start - margin, 0)
+            last_entry = min(self.visible_stop + margin, len(self.starts))
+            pixel_runs = (first_entry, last_entry,
+                          *self._create_pixel_runs(columns_per_second, first_entry, last_entry))
+            self._pixel_runs_cache.put(columns_per_second, pixel_runs)
+        _, _, run_starts, run_stops, run_color_indices = pixel_runs
+
+        from_column = math.floor(from_timestamp * columns_per_second)
+        to_column = math.floor(to_timestamp * columns_per_second)
+        first_run = bisect_right(run_stops, from_column)
+        last_run = max(first_run, bisect_right(run_starts, to_column))
+
+        # Scale the runs to the canvas. Both ends are rounded, so that neighbouring runs don't overlap.
+        pixels_per_column = pixels_per_second / columns_per_second
+        pixel_offset = timeline_helper.timeline_side_padding - timeline_helper.start_timestamp * pixels_per_second
+        colors = self.colors
+        return ((round(run_start * pixels_per_column + pixel_offset),
+                 round(run_stop * pixels_per_column + pixel_offset),
+                 colors[color_index])
+                for run_start, run_stop, color_index in zip(run_starts[first_run:last_run],
+                                                            run_stops[first_run:last_run],
+                                                            run_color_indices[first_run:last_run]))
+
+    def _create_pixel_runs(self, columns_per_second: float,
+                           first_entry: int, last_entry: int) -> Tuple[array, array, array]:
+        # Each column gets the color which covers most of it, and neighbouring
+        # columns of the same color are merged into one run
+        run_starts = array("q")
+        run_stops = array("q")
+        run_color_indices = array("I")
+
+        def add_run(run_start: int, run_stop: int, color_index: int) -> None:
+            if run_stops and run_stops[-1] == run_start and run_color_indices[-1] == color_index:
+                run_stops[-1] = run_stop
+            else:
+                run_starts.append(run_start)
+                run_stops.append(run_stop)
+                run_color_indices.append(color_index)
+
+        floor = math.floor
+        ceil = math.ceil
+        column = None
+        coverage: Dict[int, float] = {}
+        get_coverage = coverage.get
+        for start, stop, color_index in zip(self.starts[first_entry:last_entry],
+                                            self.stops[first_entry:last_entry],
+                                            self.color_indices[first_entry:last_entry]):
+            start_column_position = start * columns_per_second
+            stop_column_position = stop * columns_per_second
+            first_column = floor(start_column_position)
+            last_column = ceil(stop_column_position) - 1
+            if last_column < first_column:
+                continue
+
+            if first_column != column:
+                if coverage:
+                    add_run(column, column + 1, max(coverage, key=get_coverage))
+                    coverage.clear()
+                column = first_column
+
+            if first_column == last_column:
+                coverage[color_index] = get_coverage(color_index, 0) + stop_column_position - start_column_position
+                continue
+
+            # The entry continues past the current column, which can then be completed
+            coverage[color_index] = get_coverage(color_index, 0) + first_column + 1 - start_column_position
+            add_run(column, column + 1, max(coverage, key=get_coverage))
+            coverage.clear()
+
+            # The columns in between are fully covered by this entry
+            if first_column + 1 < last_column:
+                add_run(first_column + 1, last_column, color_index)
+
+            column = last_column
+            coverage[color_index] = stop_column_position - last_column
+
+        if coverage:
+            add_run(column, column + 1, max(coverage, key=get_coverage))
+
+        return run_starts, run_stops, run_color_indices
+
+
+def from_logged_entries(logged_entries: List) -> TimelineColumns:
+    columns = TimelineColumns()
+    add_logged_entries(columns=columns, logged_entries=logged_entries)
+    return columns
+
+
+def add_logged_entries(columns: TimelineColumns, logged_entries: List) -> None:
+    # The latest entry is replaced if it has been extended
+    for le in logged_entries:
+        if columns.is_latest_entry(le):
+            columns.pop()
+        application_window = le.application_window
+        columns.append(entry=le, start_timestamp=le.start_timestamp, stop_timestamp=le.stop_timestamp,
+                       group_id=application_window.db_id, color_key=application_window.application.name,
+                       to_color=color_helper.to_color_floats)
+    columns.clear_pixel_runs()
+
+
+def from_tagged_entries(tagged_entries: List) -> TimelineColumns:
+    columns = TimelineColumns()
+    for te in tagged_entries:
+        columns.append(entry=te, start_timestamp=datetime_helper.datetime_to_timestamp(te.start),
+                       stop_timestamp=datetime_helper.datetime_to_timestamp(te.stop),
+                       group_id=te.category.db_id, color_key=te.category_str,
+                       to_color=color_helper.to_color_floats)
+    return columns
+
+
+def from_activity_entries(activity_entries: List) -> TimelineColumns:
+    columns = TimelineColumns()
+    add_activity_entries(columns=columns, activity_entries=activity_entries)
+    return columns
+
+
+def add_activity_entries(columns: TimelineColumns, activity_entries: List) -> None:
+    # See add_logged_entries
+    for ae in activity_entries:
+        if columns.is_latest_entry(ae):
+            columns.pop()
+        columns.append(entry=ae, start_timestamp=ae.start_timestamp, stop_timestamp=ae.stop_timestamp,
+                       group_id=int(ae.active), color_key=ae.active,
+                       to_color=color_helper.activity_to_color_floats)
+    columns.clear_pixel_runs()
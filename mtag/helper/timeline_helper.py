@@ -20,6 +20,8 @@ class TimelineHelper:
         self.boundary_delta_in_seconds = self.boundary_delta_dt.total_seconds()
         self.max_x_in_timeline = self.canvas_width - self.timeline_side_padding
         self.canvas_width_without_padding = self.canvas_width - (self.timeline_side_padding * 2)
+        self.start_timestamp = self.start_dt.timestamp()
+        self.pixels_per_second = self.canvas_width_without_padding / self.boundary_delta_in_seconds
 
     def to_timeline_x(self, x_position: float) -> float:
         timeline_x = max(x_position, self.timeline_side_padding)
@@ -108,3 +110,6 @@ class TimelineHelper:
         delta_from_start = dt - self.start_dt
         relative_dt_delta = delta_from_start.total_seconds() / self.boundary_delta_in_seconds
         return relative_dt_delta * self.canvas_width_without_padding + self.timeline_side_padding
+
+    def timestamp_to_pixel(self, timestamp: float) -> float:
+        return (timestamp - self.start_timestamp) * self.pixels_per_second + self.timeline_side_padding
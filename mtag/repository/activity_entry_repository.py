@@ -8,30 +8,37 @@ from mtag.entity import ActivityEntry
 
 class ActivityEntryRepository:
     @staticmethod
-    def insert(conn: sqlite3.Connection, activity_entry: ActivityEntry) -> None:
-        conn.execute("INSERT INTO activity_entry(ae_start, ae_last_update, ae_active)"
-                     " VALUES (:start, :last_update, :active)",
-                     {"start": datetime_helper.datetime_to_timestamp(activity_entry.start),
-                      "last_update": datetime_helper.datetime_to_timestamp(activity_entry.stop),
-                      "active": 1 if activity_entry.active else 0})
-        conn.commit()
+    def insert(conn: sqlite3.Connection, activity_entry: ActivityEntry) -> int:
+        cursor = conn.execute("INSERT INTO activity_entry(ae_start, ae_last_update, ae_active)"
+                              " VALUES (:start, :last_update, :active)",
+                              {"start": activity_entry.start_timestamp,
+                               "last_update": activity_entry.stop_timestamp,
+                               "active": 1 if activity_entry.active else 0})
+        return cursor.lastrowid
+
+    @staticmethod
+    def update_stop(conn: sqlite3.Connection, activity_entry: ActivityEntry) -> None:
+        conn.execute("UPDATE activity_entry SET ae_last_update=:last_update WHERE ae_id=:db_id",
+                     {"db_id": activity_entry.db_id,
+                      "last_update": activity_entry.stop_timestamp})
 
     def get_latest_entry(self, conn: sqlite3.Connection) -> Optional[ActivityEntry]:
         cursor = conn.execute(
-                "SELECT * FROM activity_entry ORDER BY ae_last_update DESC")
+                "SELECT * FROM activity_entry ORDER BY ae_last_update DESC LIMIT 1")
         db_ae = cursor.fetchone()
         if db_ae is None:
             return None
 
         return self._from_dbo(db_ae=db_ae)
 
-    def get_all_by_date(self, conn: sqlite3.Connection, date: datetime.datetime) -> List[ActivityEntry]:
-        from_datetime = datetime.datetime(year=date.year, month=date.month, day=date.day)
-        to_datetime = from_datetime + datetime.timedelta(days=1)
-        cursor = conn.execute("SELECT * FROM activity_entry WHERE"
-                              " (:from_date <= ae_last_update AND ae_last_update < :to_date)"
-                              " OR"
-                              " (:from_date <= ae_start AND ae_start < :to_date)"
+    def get_all_in_range(self, conn: sqlite3.Connection, from_datetime: datetime.datetime,
+                         to_datetime: datetime.datetime) -> List[ActivityEntry]:
+        # See LoggedEntryRepository.get_all_in_range
+        cursor = conn.execute("SELECT ae_id, ae_start, ae_last_update, ae_active FROM activity_entry"
+                              " WHERE ae_start >= IFNULL((SELECT MAX(ae_start) FROM activity_entry"
+                              "                           WHERE ae_start < :from_date), :from_date)"
+                              " AND ae_start < :to_date"
+                              " AND ae_last_update > :from_date"
                               " ORDER BY ae_start ASC",
                               {"from_date": datetime_helper.datetime_to_timestamp(from_datetime),
                                "to_date": datetime_helper.datetime_to_timestamp(to_datetime)})
@@ -39,8 +46,23 @@ class ActivityEntryRepository:
 
         return [self._from_dbo(db_ae=db_ae) for db_ae in db_activity_entries]
 
+    def get_all_changed_since(self, conn: sqlite3.Connection, latest_activity_entry: ActivityEntry,
+                              to_datetime: datetime.datetime) -> List[ActivityEntry]:
+        # See LoggedEntryRepository.get_all_changed_since
+        cursor = conn.execute("SELECT ae_id, ae_start, ae_last_update, ae_active FROM activity_entry"
+                              " WHERE ae_start >= :start AND ae_start < :to_date"
+                              " AND (ae_id > :db_id OR (ae_id = :db_id AND ae_last_update > :last_update))"
+                              " ORDER BY ae_start ASC",
+                              {"start": latest_activity_entry.start_timestamp,
+                               "db_id": latest_activity_entry.db_id,
+                               "last_update": latest_activity_entry.stop_timestamp,
+                               "to_date": datetime_helper.datetime_to_timestamp(to_datetime)})
+        db_activity_entries = cursor.fetchall()
+
+        return [self._from_dbo(db_ae=db_ae) for db_ae in db_activity_entries]
+
     def _from_dbo(self, db_ae: dict) -> ActivityEntry:
-        return ActivityEntry(db_id=db_ae["ae_id"],
-                             start=datetime_helper.timestamp_to_datetime(db_ae["ae_start"]),
-                             stop=datetime_helper.timestamp_to_datetime(db_ae["ae_last_update"]),
-                             active=db_ae["ae_active"] == 1)
+        return ActivityEntry.from_timestamps(db_id=db_ae["ae_id"],
+                                             start_timestamp=db_ae["ae_start"],
+                                             stop_timestamp=db_ae["ae_last_update"],
+                                             active=db_ae["ae_active"] == 1)
@@ -1,14 +1,14 @@
 import sqlite3
-from typing import Optional
+from typing import Dict, Optional
 
 from mtag.entity import ApplicationPath
+from mtag.repository import identity_map
 
 
 class ApplicationPathRepository:
     @staticmethod
     def insert(conn: sqlite3.Connection, path: str) -> int:
         cursor = conn.execute("INSERT INTO application_path(ap_path) VALUES (:path)", {"path": path})
-        conn.commit()
         return cursor.lastrowid
 
     @staticmethod
@@ -18,13 +18,25 @@ class ApplicationPathRepository:
         if dbo is None:
             return None
 
-        return ApplicationPath(path=dbo["ap_path"], db_id=dbo["ap_id"])
+        return ApplicationPathRepository._from_dbo(dbo)
 
     @staticmethod
     def get(conn: sqlite3.Connection, db_id: int) -> Optional[ApplicationPath]:
+        application_path = identity_map.application_paths.get(db_id)
+        if application_path is not None:
+            return application_path
+
         cursor = conn.execute("SELECT * FROM application_path WHERE ap_id=:db_id", {"db_id": db_id})
         dbo = cursor.fetchone()
         if dbo is None:
             return None
 
-        return ApplicationPath(path=dbo["ap_path"], db_id=db_id)
+        return ApplicationPathRepository._from_dbo(dbo)
+
+    @staticmethod
+    def _from_dbo(dbo: Dict) -> ApplicationPath:
+        application_path = identity_map.application_paths.get(dbo["ap_id"])
+        if application_path is None:
+            application_path = ApplicationPath(path=dbo["ap_path"], db_id=dbo["ap_id"])
+            identity_map.application_paths.put(dbo["ap_id"], application_path)
+        return application_path
@@ -2,6 +2,7 @@ import sqlite3
 from typing import Dict, List, Tuple, Optional
 
 from mtag.entity import Category
+from mtag.repository import identity_map
 
 
 class CategoryRepository:
@@ -26,12 +27,10 @@ class CategoryRepository:
 
     def insert_main(self, conn: sqlite3.Connection, name: str) -> int:
         cursor = conn.execute("INSERT INTO category (c_name) VALUES (:name)", {"name": name})
-        conn.commit()
         return cursor.lastrowid
 
     def insert_sub(self, conn: sqlite3.Connection, name: str, parent_id: int) -> int:
         cursor = conn.execute("INSERT INTO category (c_name, c_parent_id) VALUES (:name, :parent_id)", {"name": name, "parent_id": parent_id})
-        conn.commit()
         return cursor.lastrowid
 
     def get_all_mains(self, conn: sqlite3.Connection) -> List[Category]:
@@ -63,21 +62,34 @@ class CategoryRepository:
         return [(main, self.get_all_subs(conn=conn, db_id=main.db_id)) for main in self.get_all_mains(conn=conn)]
 
     def get(self, conn: sqlite3.Connection, db_id: int) -> Category:
+        category = identity_map.categories.get(db_id)
+        if category is not None:
+            return category
+
         cursor = conn.execute("SELECT * FROM category WHERE c_id=:db_id", {"db_id": db_id})
         db_c = cursor.fetchone()
         return self._from_dbo(db_c)
 
     def update(self, conn: sqlite3.Connection, category: Category) -> None:
-        cursor = conn.execute("UPDATE category SET c_url=:url, c_name=:name, c_parent_id=:parent_id WHERE c_id=:db_id",
-                              {"url": category.url, "name": category.name, "parent_id": category.parent_id, "db_id": category.db_id})
-        conn.commit()
-        cursor.close()
+        # The shared category is dropped even if the statement fails, since it may
+        # have been changed in place before the update
+        try:
+            cursor = conn.execute("UPDATE category SET c_url=:url, c_name=:name, c_parent_id=:parent_id WHERE c_id=:db_id",
+                                  {"url": category.url, "name": category.name, "parent_id": category.parent_id, "db_id": category.db_id})
+            cursor.close()
+        finally:
+            identity_map.categories.invalidate(category.db_id)
 
     def delete(self, conn: sqlite3.Connection, category: Category) -> None:
-        cursor = conn.execute("DELETE FROM category WHERE c_id=:db_id",
-                              {"db_id": category.db_id})
-        conn.commit()
-        cursor.close()
+        try:
+            cursor = conn.execute("DELETE FROM category WHERE c_id=:db_id",
+                                  {"db_id": category.db_id})
+            cursor.close()
+        finally:
+            identity_map.categories.invalidate(category.db_id)
 
     def _from_dbo(self, db_c: Dict) -> Category:
-        return Category(name=db_c["c_name"], db_id=db_c["c_id"], url=db_c["c_url"], parent_id=db_c["c_parent_id"])
+        # The read row is the latest version of the category
+        category = Category(name=db_c["c_name"], db_id=db_c["c_id"], url=db_c["c_url"], parent_id=db_c["c_parent_id"])
+        identity_map.categories.put(category.db_id, category)
+        return category
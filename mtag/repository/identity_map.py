@@ -0,0 +1,16 @@
+from mtag.helper.cache_helper import LruCache
+
+# The entities shared by all repositories of the process, by database id.
+# Application paths, applications and windows are never changed once inserted.
+# Categories are invalidated by the category repository when changed.
+application_paths = LruCache(max_size=1024)
+applications = LruCache(max_size=1024)
+application_windows = LruCache(max_size=8192)
+categories = LruCache(max_size=1024)
+
+
+def clear() -> None:
+    application_paths.clear()
+    applications.clear()
+    application_windows.clear()
+    categories.clear()
@@ -3,58 +3,112 @@ import datetime
 from typing import Dict, List, Optional
 
 from mtag.helper import datetime_helper
-from mtag.entity import LoggedEntry, ApplicationWindow
-from mtag.repository import ApplicationWindowRepository
+from mtag.entity import LoggedEntry, ApplicationWindow, OpenLoggedEntry, Application, ApplicationPath
+from mtag.repository import identity_map
 
 
 class LoggedEntryRepository:
-    def __init__(self):
-        self.application_window_repository = ApplicationWindowRepository()
-        self.aw_cache = {}
+    @staticmethod
+    def insert(conn: sqlite3.Connection, logged_entry: LoggedEntry) -> int:
+        cursor = conn.execute("INSERT INTO logged_entry(le_application_window_id, le_start, le_last_update)"
+                              " VALUES (:application_window_id, :start, :last_update)",
+                              {"application_window_id": logged_entry.application_window.db_id,
+                               "start": logged_entry.start_timestamp,
+                               "last_update": logged_entry.stop_timestamp})
+        return cursor.lastrowid
+
+    @staticmethod
+    def update_stop(conn: sqlite3.Connection, open_logged_entry: OpenLoggedEntry) -> None:
+        conn.execute("UPDATE logged_entry SET le_last_update=:last_update WHERE le_id=:db_id",
+                     {"db_id": open_logged_entry.db_id,
+                      "last_update": datetime_helper.datetime_to_timestamp(open_logged_entry.stop)})
 
     @staticmethod
-    def insert(conn: sqlite3.Connection, logged_entry: LoggedEntry) -> None:
-        conn.execute("INSERT INTO logged_entry(le_application_window_id, le_start, le_last_update)"
-                     " VALUES (:application_window_id, :start, :last_update)",
-                     {"application_window_id": logged_entry.application_window.db_id,
-                      "start": datetime_helper.datetime_to_timestamp(logged_entry.start),
-                      "last_update": datetime_helper.datetime_to_timestamp(logged_entry.stop)})
-        conn.commit()
-
-    def get_latest_entry(self, conn: sqlite3.Connection) -> Optional[LoggedEntry]:
-        cursor = conn.execute(
-                "SELECT * FROM logged_entry ORDER BY le_last_update DESC")
+    def get_latest_open_entry(conn: sqlite3.Connection) -> Optional[OpenLoggedEntry]:
+        cursor = conn.execute("SELECT le_id, le_application_window_id, le_last_update FROM logged_entry"
+                              " ORDER BY le_last_update DESC LIMIT 1")
         db_le = cursor.fetchone()
         if db_le is None:
             return None
 
-        return self._from_dbo(conn=conn, db_le=db_le)
+        return OpenLoggedEntry(db_id=db_le["le_id"],
+                               application_window_id=db_le["le_application_window_id"],
+                               stop=datetime_helper.timestamp_to_datetime(db_le["le_last_update"]))
 
-    def get_all_by_date(self, conn: sqlite3.Connection, date: datetime.datetime) -> List[LoggedEntry]:
-        from_datetime = datetime.datetime(year=date.year, month=date.month, day=date.day)
-        to_datetime = from_datetime + datetime.timedelta(days=1)
-        cursor = conn.execute("SELECT * FROM logged_entry WHERE"
-                              " (:from_date <= le_last_update AND le_last_update < :to_date)"
-                              " OR"
-                              " (:from_date <= le_start AND le_start < :to_date)"
+    def get_all_in_range(self, conn: sqlite3.Connection, from_datetime: datetime.datetime,
+                         to_datetime: datetime.datetime) -> List[LoggedEntry]:
+        # The logged entries never overlap, and neither do the activity entries. The only entry
+        # starting before the range that can reach into it is then the one with the latest start,
+        # which bounds the scan of the start index. The watcher starts a new logged or activity
+        # entry only after the latest one, which is the only one it ever extends.
+        # The windows, applications and paths are joined in, so that a range is loaded in a single query
+        cursor = conn.execute("SELECT le_id, le_start, le_last_update, aw_id, aw_title, a_id, a_name, ap_id, ap_path"
+                              " FROM logged_entry"
+                              " INNER JOIN application_window ON le_application_window_id = aw_id"
+                              " INNER JOIN application ON aw_application_id = a_id"
+                              " INNER JOIN application_path ON a_path_id = ap_id"
+                              " WHERE le_start >= IFNULL((SELECT MAX(le_start) FROM logged_entry"
+                              "                           WHERE le_start < :from_date), :from_date)"
+                              " AND le_start < :to_date"
+                              " AND le_last_update > :from_date"
                               " ORDER BY le_start ASC",
                               {"from_date": datetime_helper.datetime_to_timestamp(from_datetime),
                                "to_date": datetime_helper.datetime_to_timestamp(to_datetime)})
         db_logged_entries = cursor.fetchall()
 
-        return [self._from_dbo(conn=conn, db_le=db_le) for db_le in db_logged_entries]
+        return [self._from_dbo(db_le=db_le) for db_le in db_logged_entries]
 
-    def _from_dbo(self, conn: sqlite3.Connection, db_le: Dict) -> LoggedEntry:
-        application_window = self._get_application_window(conn, db_le["le_application_window_id"])
+    def get_all_changed_since(self, conn: sqlite3.Connection, latest_logged_entry: LoggedEntry,
+                              to_datetime: datetime.datetime) -> List[LoggedEntry]:
+        # Entries are inserted in order and only the latest one is extended, so the changes since
+        # the latest known entry are that entry being extended and the entries inserted after it.
+        # None of them start before it, which keeps the search to the end of the start index.
+        cursor = conn.execute("SELECT le_id, le_start, le_last_update, aw_id, aw_title, a_id, a_name, ap_id, ap_path"
+                              " FROM logged_entry"
+                              " INNER JOIN application_window ON le_application_window_id = aw_id"
+                              " INNER JOIN application ON aw_application_id = a_id"
+                              " INNER JOIN application_path ON a_path_id = ap_id"
+                              " WHERE le_start >= :start AND le_start < :to_date"
+                              " AND (le_id > :db_id OR (le_id = :db_id AND le_last_update > :last_update))"
+                              " ORDER BY le_start ASC",
+                              {"start": latest_logged_entry.start_timestamp,
+                               "db_id": latest_logged_entry.db_id,
+                               "last_update": latest_logged_entry.stop_timestamp,
+                               "to_date": datetime_helper.datetime_to_timestamp(to_datetime)})
+        db_logged_entries = cursor.fetchall()
 
-        return LoggedEntry(start=datetime_helper.timestamp_to_datetime(db_le["le_start"]),
-                           stop=datetime_helper.timestamp_to_datetime(db_le["le_last_update"]),
-                           application_window=application_window, db_id=db_le["le_id"])
+        return [self._from_dbo(db_le=db_le) for db_le in db_logged_entries]
 
-    def _get_application_window(self, conn: sqlite3.Connection, aw_id: int) -> ApplicationWindow:
-        if aw_id in self.aw_cache:
-            return self.aw_cache[aw_id]
+    def _from_dbo(self, db_le: Dict) -> LoggedEntry:
+        return LoggedEntry.from_timestamps(start_timestamp=db_le["le_start"], stop_timestamp=db_le["le_last_update"],
+                                           application_window=self._get_application_window(db_le),
+                                           db_id=db_le["le_id"])
 
-        application_window = self.application_window_repository.get(conn, aw_id)
-        self.aw_cache[aw_id] = application_window
+    # The same window, application and path objects are shared by all entries referring to them
+    @staticmethod
+    def _get_application_window(db_le: Dict) -> ApplicationWindow:
+        application_window = identity_map.application_windows.get(db_le["aw_id"])
+        if application_window is None:
+            application_window = ApplicationWindow(title=db_le["aw_title"],
+                                                   application=LoggedEntryRepository._get_application(db_le),
+                                                   db_id=db_le["aw_id"])
+            identity_map.application_windows.put(db_le["aw_id"], application_window)
         return application_window
+
+    @staticmethod
+    def _get_application(db_le: Dict) -> Application:
+        application = identity_map.applications.get(db_le["a_id"])
+        if application is None:
+            application = Application(name=db_le["a_name"],
+                                      application_path=LoggedEntryRepository._get_application_path(db_le),
+                                      db_id=db_le["a_id"])
+            identity_map.applications.put(db_le["a_id"], application)
+        return application
+
+    @staticmethod
+    def _get_application_path(db_le: Dict) -> ApplicationPath:
+        application_path = identity_map.application_paths.get(db_le["ap_id"])
+        if application_path is None:
+            application_path = ApplicationPath(path=db_le["ap_path"], db_id=db_le["ap_id"])
+            identity_map.application_paths.put(db_le["ap_id"], application_path)
+        return application_path
@@ -1,6 +1,6 @@
 import sqlite3
 import datetime
-from typing import Dict, List
+from typing import Dict, List, Tuple
 
 from mtag.helper import datetime_helper
 from mtag.entity import TaggedEntry, Category
@@ -10,9 +10,11 @@ from mtag.repository import CategoryRepository
 class TaggedEntryRepository:
     def __init__(self):
         self.category_repository = CategoryRepository()
-        self.category_cache = {}
 
-    def insert(self, conn: sqlite3.Connection, tagged_entry: TaggedEntry) -> None:
+    def insert(self, conn: sqlite3.Connection,
+               tagged_entry: TaggedEntry) -> Tuple[datetime.datetime, datetime.datetime]:
+        # Returns the range of the stored entry, which is larger than the given one
+        # if it has been merged with its neighbours
         cursor = conn.execute("SELECT te_id, te_start"
                               " FROM tagged_entry"
                               " WHERE te_end=:new_te_start"
@@ -28,6 +30,9 @@ class TaggedEntryRepository:
                         "new_te_category_id": tagged_entry.category.db_id})
         te_to_the_right_dbo = cursor.fetchone()
 
+        start = tagged_entry.start
+        stop = tagged_entry.stop
+
         # We have neighbours to the left and right. Update the one to the left
         # and delete the one to the right.
         if te_to_the_left_dbo is not None and te_to_the_right_dbo is not None:
@@ -36,16 +41,20 @@ class TaggedEntryRepository:
             cursor.execute("UPDATE tagged_entry SET te_end=:right_te_end WHERE te_id==:te_left_id",
                            {"right_te_end": te_to_the_right_dbo["te_end"],
                             "te_left_id": te_to_the_left_dbo["te_id"]})
+            start = datetime_helper.timestamp_to_datetime(te_to_the_left_dbo["te_start"])
+            stop = datetime_helper.timestamp_to_datetime(te_to_the_right_dbo["te_end"])
         # Update the entry to the left instead of creating a new one
         elif te_to_the_left_dbo is not None:
             cursor.execute("UPDATE tagged_entry SET te_end=:new_te_end WHERE te_id==:te_left_id",
                            {"new_te_end": datetime_helper.datetime_to_timestamp(tagged_entry.stop),
                             "te_left_id": te_to_the_left_dbo["te_id"]})
+            start = datetime_helper.timestamp_to_datetime(te_to_the_left_dbo["te_start"])
         # Update the entry to the right instead of creating a new one
         elif te_to_the_right_dbo is not None:
             cursor.execute("UPDATE tagged_entry SET te_start=:new_te_start WHERE te_id==:te_right_id",
                            {"new_te_start": datetime_helper.datetime_to_timestamp(tagged_entry.start),
                             "te_right_id": te_to_the_right_dbo["te_id"]})
+            stop = datetime_helper.timestamp_to_datetime(te_to_the_right_dbo["te_end"])
         # No relevant neighbour. Create a new entry
         else:
             cursor.execute("INSERT INTO tagged_entry (te_category_id, te_start, te_end)"
@@ -54,7 +63,7 @@ class TaggedEntryRepository:
                             "start": datetime_helper.datetime_to_timestamp(tagged_entry.start),
                             "end": datetime_helper.datetime_to_timestamp(tagged_entry.stop)})
 
-        conn.commit()
+        return start, stop
 
     def update(self, conn: sqlite3.Connection, tagged_entry: TaggedEntry) -> None:
         conn.execute("UPDATE tagged_entry SET te_category_id=:te_category_id, te_start=:te_start, te_end=:te_end"
@@ -65,19 +74,17 @@ class TaggedEntryRepository:
                       "te_category_id": tagged_entry.category.db_id
                       })
 
-        conn.commit()
-
     def delete(self, conn: sqlite3.Connection, db_id: int) -> None:
         conn.execute("DELETE FROM tagged_entry WHERE te_id=:db_id", {"db_id": db_id})
-        conn.commit()
-
-    def get_all_by_date(self, conn: sqlite3.Connection, date: datetime.datetime) -> List[TaggedEntry]:
-        from_datetime = datetime.datetime(year=date.year, month=date.month, day=date.day)
-        to_datetime = from_datetime + datetime.timedelta(days=1)
-        cursor = conn.execute("SELECT * FROM tagged_entry WHERE"
-                              " (:from_date <= te_start AND te_start < :to_date)"
-                              " OR"
-                              " (:from_date <= te_end AND te_end < :to_date)"
+
+    def get_all_in_range(self, conn: sqlite3.Connection, from_datetime: datetime.datetime,
+                         to_datetime: datetime.datetime) -> List[TaggedEntry]:
+        # Unlike the logged and activity entries, tagged entries may overlap. Older versions
+        # didn't load the tagged entries spanning a whole day, so new ones weren't clamped to them.
+        # There are few tagged entries, so the plain overlap predicate is cheap enough.
+        cursor = conn.execute("SELECT te_id, te_category_id, te_start, te_end FROM tagged_entry"
+                              " WHERE te_start < :to_date"
+                              " AND te_end > :from_date"
                               " ORDER BY te_start ASC",
                               {"from_date": datetime_helper.datetime_to_timestamp(from_datetime),
                                "to_date": datetime_helper.datetime_to_timestamp(to_datetime)})
@@ -128,9 +135,4 @@ class TaggedEntryRepository:
                            db_id=db_te["te_id"])
 
     def _get_category(self, conn: sqlite3.Connection, c_id: int) -> Category:
-        if c_id in self.category_cache:
-            return self.category_cache[c_id]
-
-        category = self.category_repository.get(conn=conn, db_id=c_id)
-        self.category_cache[c_id] = category
-        return category
+        return self.category_repository.get(conn=conn, db_id=c_id)
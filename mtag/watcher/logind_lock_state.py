@@ -0,0 +1,108 @@
+import logging
+import os
+import subprocess
+from typing import Optional
+
+LOGIND_BUS_NAME = "org.freedesktop.login1"
+LOGIND_MANAGER_PATH = "/org/freedesktop/login1"
+LOGIND_SESSION_INTERFACE = "org.freedesktop.login1.Session"
+
+
+def _import_gio():
+    # PyGObject is optional for the watcher, which falls back to loginctl without it
+    import gi
+    gi.require_version("Gio", "2.0")
+    from gi.repository import Gio, GLib
+    return Gio, GLib
+
+
+class LogindLockStateProvider:
+    def __init__(self):
+        Gio, GLib = _import_gio()
+        self._gio = Gio
+        self._glib = GLib
+        self._main_context = GLib.MainContext.default()
+        bus = Gio.bus_get_sync(Gio.BusType.SYSTEM, None)
+
+        manager = self._create_proxy(bus=bus, object_path=LOGIND_MANAGER_PATH,
+                                     interface_name="org.freedesktop.login1.Manager")
+        user_path = manager.call_sync("GetUser", GLib.Variant("(u)", (os.getuid(),)),
+                                      Gio.DBusCallFlags.NONE, -1, None).unpack()[0]
+
+        # The display session is the graphical session of the user
+        user = self._create_proxy(bus=bus, object_path=user_path, interface_name="org.freedesktop.login1.User")
+        display = user.get_cached_property("Display")
+        session_id, session_path = display.unpack() if display is not None else ("", "/")
+        if session_path == "/":
+            raise RuntimeError("The user has no graphical session")
+
+        logging.debug(f"Tracking the lock state of session {session_id} ({session_path})")
+        self._session = self._create_proxy(bus=bus, object_path=session_path, interface_name=LOGIND_SESSION_INTERFACE)
+        self._session.connect("g-properties-changed", self._on_properties_changed)
+        self._session.connect("g-signal", self._on_signal)
+        self._locked = self._read_locked_hint()
+
+    def is_locked(self) -> bool:
+        # Handle the signals that have arrived since the last call, without blocking
+        while self._main_context.iteration(False):
+            pass
+
+        logging.debug("Locked" if self._locked else "Not locked")
+        return self._locked
+
+    def _create_proxy(self, bus: "Gio.DBusConnection", object_path: str, interface_name: str) -> "Gio.DBusProxy":
+        return self._gio.DBusProxy.new_sync(bus, self._gio.DBusProxyFlags.NONE, None,
+                                            LOGIND_BUS_NAME, object_path, interface_name, None)
+
+    def _read_locked_hint(self) -> bool:
+        result = self._session.call_sync("org.freedesktop.DBus.Properties.Get",
+                                         self._glib.Variant("(ss)", (LOGIND_SESSION_INTERFACE, "LockedHint")),
+                                         self._gio.DBusCallFlags.NONE, -1, None)
+        return bool(result.unpack()[0])
+
+    def _on_properties_changed(self, _proxy: "Gio.DBusProxy", changed_properties: "GLib.Variant",
+                               invalidated_properties: list) -> None:
+        changed_properties = changed_properties.unpack()
+        if "LockedHint" in changed_properties:
+            self._locked = bool(changed_properties["LockedHint"])
+        elif "LockedHint" in invalidated_properties:
+            self._locked = self._read_locked_hint()
+
+    def _on_signal(self, _proxy: "Gio.DBusProxy", _sender_name: str, signal_name: str,
+                   _parameters: "GLib.Variant") -> None:
+        # The screen locker confirms these through the LockedHint property
+        if signal_name == "Lock":
+            self._locked = True
+        elif signal_name == "Unlock":
+            self._locked = False
+
+
+class LoginctlLockStateProvider:
+    def __init__(self):
+        self._session_id: Optional[str] = None
+
+    def is_locked(self) -> bool:
+        if self._session_id is None:
+            self._session_id = subprocess.run(["loginctl", "show-user", "-pDisplay", "--value", str(os.getuid())],
+                                              stdout=subprocess.PIPE, universal_newlines=True).stdout.strip()
+            logging.debug(f"{os.getuid()} => {self._session_id}")
+
+        locked_hint = subprocess.run(["loginctl", "show-session", "-pLockedHint", "--value", self._session_id],
+                                     stdout=subprocess.PIPE).stdout.strip()
+        if locked_hint.lower() == b"no":
+            logging.debug("Not locked")
+            return False
+        elif locked_hint.lower() == b"yes":
+            logging.debug("Locked")
+            return True
+        else:
+            logging.debug(f"Unknown lock hint: {locked_hint}")
+            return False
+
+
+def create_lock_state_provider():
+    try:
+        return LogindLockStateProvider()
+    except Exception as ex:
+        logging.warning(f"Unable to track the lock state through logind, falling back to loginctl: {ex}")
+        return LoginctlLockStateProvider()
@@ -0,0 +1,23 @@
+from collections import namedtuple
+from typing import Callable, Optional
+
+from mtag.helper.cache_helper import LruCache
+
+
+ProcessMetadata = namedtuple("ProcessMetadata", ["application_path", "application_name"])
+
+# Process ids are reused, so a process is identified by its id together with its start time
+process_metadata_cache = LruCache(max_size=64)
+
+
+def get_process_metadata(pid: int, start_time: Optional[int],
+                         read_process_metadata: Callable[[], ProcessMetadata]) -> ProcessMetadata:
+    cache_key = (pid, start_time)
+    process_metadata = process_metadata_cache.get(cache_key)
+    if process_metadata is None:
+        process_metadata = read_process_metadata()
+        # Without a start time the process can't be told apart from a later one with the same id
+        if start_time is not None:
+            process_metadata_cache.put(cache_key, process_metadata)
+
+    return process_metadata
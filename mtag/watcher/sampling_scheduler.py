@@ -0,0 +1,29 @@
+import logging
+from typing import Optional
+
+from mtag.helper.configuration_helper import Configuration
+
+# Idle periods shorter than this are just pauses between key presses
+IDLE_SECONDS_BEFORE_BACKING_OFF = 30
+
+
+class SamplingScheduler:
+    def __init__(self):
+        self.interval_seconds: Optional[float] = None
+
+    def get_next_interval(self, configuration: Configuration, idle_period: int, locked_state: bool) -> float:
+        # Entries are split when they haven't been updated for seconds_before_new_entry,
+        # so leave room for a slow sample, both when active and when backing off.
+        interval_cap = configuration.seconds_before_new_entry / 2
+        min_interval = min(max(1, configuration.min_sampling_interval_seconds), interval_cap)
+        max_interval = min(configuration.max_sampling_interval_seconds, interval_cap)
+        max_interval = max(min_interval, max_interval)
+
+        if locked_state or IDLE_SECONDS_BEFORE_BACKING_OFF <= idle_period:
+            previous_interval = self.interval_seconds if self.interval_seconds is not None else min_interval
+            self.interval_seconds = min(max_interval, previous_interval * 2)
+        else:
+            self.interval_seconds = min_interval
+
+        logging.debug(f"Next sample in {self.interval_seconds} seconds")
+        return self.interval_seconds
@@ -0,0 +1,52 @@
+import bisect
+import collections
+from typing import Deque, List, Tuple
+
+# Upper bounds of the histogram buckets, in milliseconds
+BUCKET_LIMITS_MS = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000]
+
+
+class TickStatistics:
+    def __init__(self, max_ticks: int = 1000):
+        self._ticks: Deque[Tuple[float, float]] = collections.deque(maxlen=max_ticks)
+
+    def add_tick(self, probe_seconds: float, database_seconds: float) -> None:
+        self._ticks.append((probe_seconds * 1000, database_seconds * 1000))
+
+    def __len__(self) -> int:
+        return len(self._ticks)
+
+    def to_text(self) -> str:
+        if len(self._ticks) == 0:
+            return "No ticks have been recorded"
+
+        probe_times = [probe for probe, _ in self._ticks]
+        database_times = [database for _, database in self._ticks]
+        total_times = [probe + database for probe, database in self._ticks]
+        lines = [f"Timings of the latest {len(self._ticks)} ticks (ms):",
+                 f"{'':>10} {'p50':>8} {'p95':>8} {'max':>8}"]
+        for name, times in [("probe", probe_times), ("database", database_times), ("total", total_times)]:
+            lines.append(f"{name:>10} {_percentile(times, 50):8.1f} {_percentile(times, 95):8.1f} {max(times):8.1f}")
+
+        lines.append(f"{'<= ms':>10} {'probe':>8} {'database':>8} {'total':>8}")
+        probe_counts = _to_histogram(probe_times)
+        database_counts = _to_histogram(database_times)
+        total_counts = _to_histogram(total_times)
+        limits = [str(limit) for limit in BUCKET_LIMITS_MS] + ["inf"]
+        for limit, probe_count, database_count, total_count in zip(limits, probe_counts,
+                                                                   database_counts, total_counts):
+            lines.append(f"{limit:>10} {probe_count:8} {database_count:8} {total_count:8}")
+        return "\n".join(lines)
+
+
+def _to_histogram(times: List[float]) -> List[int]:
+    counts = [0] * (len(BUCKET_LIMITS_MS) + 1)
+    for t in times:
+        counts[bisect.bisect_left(BUCKET_LIMITS_MS, t)] += 1
+    return counts
+
+
+def _percentile(times: List[float], percent: int) -> float:
+    sorted_times = sorted(times)
+    index = min(len(sorted_times) - 1, len(sorted_times) * percent // 100)
+    return sorted_times[index]
@@ -1,18 +1,31 @@
 import datetime
 import logging
+import sqlite3
+import time
 from typing import Optional
 
 from mtag.entity import LoggedEntry, Application, ApplicationWindow, ApplicationPath, ActivityEntry
-from mtag.helper import database_helper, datetime_helper, configuration_helper
+from mtag.entity import OpenLoggedEntry
+from mtag.helper import datetime_helper, configuration_helper
+from mtag.helper.cache_helper import LruCache
 from mtag.repository import ApplicationRepository, ApplicationPathRepository
 from mtag.repository import LoggedEntryRepository, ApplicationWindowRepository
-from mtag.repository import ActivityEntryRepository
+from mtag.repository import ActivityEntryRepository, identity_map
+from mtag.watcher.watcher_session import WatcherSession
 
 
-def register(window_title: Optional[str], application_name: Optional[str],
+# The focused window rarely changes between two ticks, so keep the latest
+# seen dimensions in memory to avoid looking them up in the database.
+application_path_cache = LruCache(max_size=64)
+application_cache = LruCache(max_size=128)
+application_window_cache = LruCache(max_size=512)
+
+
+def register(session: WatcherSession, window_title: Optional[str], application_name: Optional[str],
              application_path: Optional[str], idle_period: Optional[int],
              locked_state: bool = False) -> None:
     configuration = configuration_helper.get_configuration()
+    session.configuration = configuration
 
     window_title_to_use = window_title if window_title is not None else "N/A"
     application_name_to_use = application_name if application_name is not None else "N/A"
@@ -24,152 +37,296 @@ def register(window_title: Optional[str], application_name: Optional[str],
     logging.info(application_path_to_use)
     logging.info(f"{application_name_to_use} -> {window_title_to_use}")
 
+    session.idle_period = idle_period_to_use
+    session.locked_state = locked_state
+
+    database_start = time.monotonic()
+    try:
+        _register_in_transaction(session=session,
+                                 configuration=configuration,
+                                 window_title=window_title_to_use,
+                                 application_name=application_name_to_use,
+                                 application_path=application_path_to_use,
+                                 idle_period=idle_period_to_use,
+                                 locked_state=locked_state)
+    except sqlite3.IntegrityError as ex:
+        if "FOREIGN KEY" not in str(ex):
+            raise
+
+        # A cached dimension might have been removed from the database.
+        # The caches have been cleared, so try again.
+        logging.warning(f"Integrity error when registering, retrying without cached dimensions: {ex}")
+        _register_in_transaction(session=session,
+                                 configuration=configuration,
+                                 window_title=window_title_to_use,
+                                 application_name=application_name_to_use,
+                                 application_path=application_path_to_use,
+                                 idle_period=idle_period_to_use,
+                                 locked_state=locked_state)
+    finally:
+        session.database_seconds += time.monotonic() - database_start
+
+
+def flush_pending_updates(session: WatcherSession) -> None:
+    if not session.has_unflushed_updates:
+        return
+
+    db_connection = session.get_connection()
+    with db_connection:
+        _flush_pending_updates(session=session, db_connection=db_connection,
+                               datetime_now=datetime.datetime.now())
+
+
+def clear_dimension_caches() -> None:
+    application_path_cache.clear()
+    application_cache.clear()
+    application_window_cache.clear()
+    identity_map.clear()
+
+
+def _register_in_transaction(session: WatcherSession, configuration: configuration_helper.Configuration,
+                             window_title: str, application_name: str, application_path: str,
+                             idle_period: int, locked_state: bool) -> None:
+    db_connection = session.get_connection()
+
+    # All the writes of a tick, including new dimensions, are committed at once
+    try:
+        with db_connection:
+            _register_in_database(session=session,
+                                  configuration=configuration,
+                                  db_connection=db_connection,
+                                  window_title=window_title,
+                                  application_name=application_name,
+                                  application_path=application_path,
+                                  idle_period=idle_period,
+                                  locked_state=locked_state)
+    except Exception:
+        # Dimensions inserted in the rolled back transaction may have been cached,
+        # and the open entries may no longer match what is in the database.
+        clear_dimension_caches()
+        session.forget_open_entries()
+        raise
+
+
+def _register_in_database(session: WatcherSession, configuration: configuration_helper.Configuration,
+                          db_connection: sqlite3.Connection, window_title: str, application_name: str,
+                          application_path: str, idle_period: int, locked_state: bool) -> None:
     # Application path
-    application_path = insert_if_needed_and_get_application_path(application_path=application_path_to_use)
+    application_path = insert_if_needed_and_get_application_path(db_connection=db_connection,
+                                                                 application_path=application_path)
 
     # Application
-    application = insert_if_needed_and_get_application(application_name=application_name_to_use,
+    application = insert_if_needed_and_get_application(db_connection=db_connection,
+                                                       application_name=application_name,
                                                        application_path=application_path)
 
     # Application window
-    application_window = insert_if_needed_and_get_application_window(application=application,
-                                                                     window_title=window_title_to_use)
+    application_window = insert_if_needed_and_get_application_window(db_connection=db_connection,
+                                                                     application=application,
+                                                                     window_title=window_title)
 
     datetime_now = datetime.datetime.now()
 
     # Logged entry
-    register_logged_entry(application_window=application_window, datetime_now=datetime_now)
+    register_logged_entry(session=session, configuration=configuration, db_connection=db_connection,
+                          application_window=application_window, datetime_now=datetime_now)
 
     # Activity entry
-    register_activity_entry(idle_period=idle_period_to_use, locked_state=locked_state, datetime_now=datetime_now)
+    register_activity_entry(session=session, configuration=configuration, db_connection=db_connection,
+                            idle_period=idle_period, locked_state=locked_state, datetime_now=datetime_now)
 
+    # Write the deferred updates if they have been kept in memory for long enough
+    if session.is_flush_due(datetime_now=datetime_now, write_behind_seconds=configuration.write_behind_seconds):
+        _flush_pending_updates(session=session, db_connection=db_connection, datetime_now=datetime_now)
 
-def register_activity_entry(idle_period: int, locked_state: bool, datetime_now: datetime.datetime):
-    configuration = configuration_helper.get_configuration()
+
+def _flush_pending_updates(session: WatcherSession, db_connection: sqlite3.Connection,
+                           datetime_now: datetime.datetime) -> None:
+    if session.has_unflushed_updates:
+        logging.info("Writing the deferred entry updates")
+        if session.open_logged_entry is not None:
+            LoggedEntryRepository.update_stop(conn=db_connection, open_logged_entry=session.open_logged_entry)
+
+        if session.open_activity_entry is not None:
+            ActivityEntryRepository.update_stop(conn=db_connection, activity_entry=session.open_activity_entry)
+
+    session.has_unflushed_updates = False
+    session.last_flush = datetime_now
+
+
+def _is_in_later_second(datetime_now: datetime.datetime, previous: datetime.datetime) -> bool:
+    # Entries are stored with a resolution of seconds, and their boundaries must be unique
+    return datetime_helper.datetime_to_timestamp(previous) < datetime_helper.datetime_to_timestamp(datetime_now)
+
+
+def register_activity_entry(session: WatcherSession, configuration: configuration_helper.Configuration,
+                            db_connection: sqlite3.Connection, idle_period: int, locked_state: bool,
+                            datetime_now: datetime.datetime):
     activity_entry_repository = ActivityEntryRepository()
     was_active = not locked_state and idle_period < configuration.inactive_after_idle_seconds
+    write_behind = configuration.write_behind_seconds > 0
 
-    with database_helper.create_connection() as db_connection:
+    last_activity_entry = session.open_activity_entry
+    if last_activity_entry is None:
         last_activity_entry = activity_entry_repository.get_latest_entry(conn=db_connection)
-        if last_activity_entry is None:
-            logging.info("No existing activity entry, creating a new one")
+
+    activity_entry = None
+    if last_activity_entry is None:
+        logging.info("No existing activity entry, creating a new one")
+        new_update = datetime_now + datetime.timedelta(seconds=1)
+        activity_entry = ActivityEntry(start=datetime_now, stop=new_update, active=was_active)
+    else:
+        max_delta_seconds = configuration.seconds_before_new_entry
+        max_delta_period = datetime.timedelta(seconds=max_delta_seconds)
+
+        old_end = last_activity_entry.stop
+        if max_delta_period < datetime_now - old_end:
+            logging.info("Too long since last update. Create a new entry.")
+
             new_update = datetime_now + datetime.timedelta(seconds=1)
             activity_entry = ActivityEntry(start=datetime_now, stop=new_update, active=was_active)
-            activity_entry_repository.insert(conn=db_connection, activity_entry=activity_entry)
-        else:
-            max_delta_seconds = configuration.seconds_before_new_entry
-            max_delta_period = datetime.timedelta(seconds=max_delta_seconds)
-
-            old_end = last_activity_entry.stop
-            if max_delta_period < datetime_now - old_end:
-                logging.info("Too long since last update. Create a new entry.")
-
-                new_update = datetime_now + datetime.timedelta(seconds=1)
-                activity_entry = ActivityEntry(start=datetime_now, stop=new_update, active=was_active)
-                activity_entry_repository.insert(db_connection, activity_entry)
-            elif last_activity_entry.active == was_active:
-                logging.info("Still same activity level. Update existing entry")
-
-                db_connection.execute("UPDATE activity_entry SET ae_last_update=:new_update WHERE ae_id=:id",
-                                      {"id": last_activity_entry.db_id,
-                                       "new_update": datetime_helper.datetime_to_timestamp(datetime_now)})
+        elif not _is_in_later_second(datetime_now=datetime_now, previous=old_end):
+            logging.info("The activity entry was updated during this second. Wait for the next tick.")
+        elif last_activity_entry.active == was_active:
+            logging.info("Still same activity level. Update existing entry")
+
+            last_activity_entry.stop = datetime_now
+            if write_behind:
+                session.has_unflushed_updates = True
             else:
-                logging.info("Not the same activity level. Insert new activity entry")
+                activity_entry_repository.update_stop(conn=db_connection, activity_entry=last_activity_entry)
+        else:
+            logging.info("Not the same activity level. Insert new activity entry")
 
-                activity_entry = ActivityEntry(start=last_activity_entry.stop, stop=datetime_now, active=was_active)
-                activity_entry_repository.insert(db_connection, activity_entry)
+            activity_entry = ActivityEntry(start=last_activity_entry.stop, stop=datetime_now, active=was_active)
 
-        db_connection.commit()
+    if activity_entry is not None:
+        # The deferred updates belong to the entries that are about to be left behind
+        _flush_pending_updates(session=session, db_connection=db_connection, datetime_now=datetime_now)
+        activity_entry.db_id = activity_entry_repository.insert(conn=db_connection, activity_entry=activity_entry)
+        last_activity_entry = activity_entry
 
+    session.open_activity_entry = last_activity_entry
 
-def register_logged_entry(application_window: ApplicationWindow, datetime_now: datetime.datetime):
+
+def register_logged_entry(session: WatcherSession, configuration: configuration_helper.Configuration,
+                          db_connection: sqlite3.Connection, application_window: ApplicationWindow,
+                          datetime_now: datetime.datetime):
     logged_entry_repository = LoggedEntryRepository()
+    write_behind = configuration.write_behind_seconds > 0
+
+    last_logged_entry = session.open_logged_entry
+    if last_logged_entry is None:
+        last_logged_entry = logged_entry_repository.get_latest_open_entry(conn=db_connection)
+
+    logged_entry = None
+    if last_logged_entry is None:
+        logging.info("No existing logged entry, creating a new one")
+        new_update = datetime_now + datetime.timedelta(seconds=1)
+        logged_entry = LoggedEntry(start=datetime_now,
+                                   stop=new_update,
+                                   application_window=application_window)
+    else:
+        max_delta_seconds = configuration.seconds_before_new_entry
+        max_delta_period = datetime.timedelta(seconds=max_delta_seconds)
+
+        old_end = last_logged_entry.stop
+        if max_delta_period < datetime_now - old_end:
+            logging.info("Too long since last update. Create a new entry.")
 
-    with database_helper.create_connection() as db_connection:
-        last_logged_entry = logged_entry_repository.get_latest_entry(conn=db_connection)
-        if last_logged_entry is None:
-            logging.info("No existing logged entry, creating a new one")
             new_update = datetime_now + datetime.timedelta(seconds=1)
-            logged_entry = LoggedEntry(start=datetime_now,
-                                       stop=new_update,
-                                       application_window=application_window)
-            logged_entry_repository.insert(conn=db_connection, logged_entry=logged_entry)
-        else:
-            configuration = configuration_helper.get_configuration()
-            max_delta_seconds = configuration.seconds_before_new_entry
-            max_delta_period = datetime.timedelta(seconds=max_delta_seconds)
-
-            old_end = last_logged_entry.stop
-            if max_delta_period < datetime_now - old_end:
-                logging.info("Too long since last update. Create a new entry.")
-
-                new_update = datetime_now + datetime.timedelta(seconds=1)
-                logged_entry = LoggedEntry(start=datetime_now, stop=new_update, application_window=application_window)
-                logged_entry_repository.insert(db_connection, logged_entry)
-            elif last_logged_entry.application_window.db_id == application_window.db_id:
-                logging.info("Still same window. Update existing logged entry")
-
-                db_connection.execute("UPDATE logged_entry SET le_last_update=:new_update WHERE le_id=:id",
-                                      {"id": last_logged_entry.db_id,
-                                       "new_update": datetime_helper.datetime_to_timestamp(datetime_now)})
+            logged_entry = LoggedEntry(start=datetime_now, stop=new_update, application_window=application_window)
+        elif not _is_in_later_second(datetime_now=datetime_now, previous=old_end):
+            logging.info("The logged entry was updated during this second. Wait for the next tick.")
+        elif last_logged_entry.application_window_id == application_window.db_id:
+            logging.info("Still same window. Update existing logged entry")
+
+            last_logged_entry.stop = datetime_now
+            if write_behind:
+                session.has_unflushed_updates = True
             else:
-                logging.info("Not the same window. Insert new logged entry")
+                logged_entry_repository.update_stop(conn=db_connection, open_logged_entry=last_logged_entry)
+        else:
+            logging.info("Not the same window. Insert new logged entry")
 
-                logged_entry = LoggedEntry(start=last_logged_entry.stop, stop=datetime_now,
-                                           application_window=application_window)
-                logged_entry_repository.insert(db_connection, logged_entry)
+            logged_entry = LoggedEntry(start=last_logged_entry.stop, stop=datetime_now,
+                                       application_window=application_window)
 
-        db_connection.commit()
+    if logged_entry is not None:
+        # The deferred updates belong to the entries that are about to be left behind
+        _flush_pending_updates(session=session, db_connection=db_connection, datetime_now=datetime_now)
+        db_id = logged_entry_repository.insert(conn=db_connection, logged_entry=logged_entry)
+        last_logged_entry = OpenLoggedEntry(db_id=db_id, application_window_id=application_window.db_id,
+                                            stop=logged_entry.stop)
 
+    session.open_logged_entry = last_logged_entry
 
-def insert_if_needed_and_get_application_window(application: Application, window_title: str) -> ApplicationWindow:
-    with database_helper.create_connection() as db_connection:
-        application_window_repository = ApplicationWindowRepository()
-        application_window = application_window_repository.get_by_title_and_application_id(conn=db_connection,
-                                                                                           title=window_title,
-                                                                                           application_id=application.db_id)
 
-        # We couldn't find an existing entry in the database. Insert a new one.
-        if application_window is None:
-            logging.info("Adding new application window")
-            application_window = ApplicationWindow(title=window_title, application=application)
-            db_id = application_window_repository.insert(conn=db_connection, application_window=application_window)
-            application_window.db_id = db_id
+def insert_if_needed_and_get_application_window(db_connection: sqlite3.Connection, application: Application,
+                                                window_title: str) -> ApplicationWindow:
+    cache_key = (application.db_id, window_title)
+    application_window = application_window_cache.get(cache_key)
+    if application_window is not None:
+        return application_window
 
+    application_window_repository = ApplicationWindowRepository()
+    application_window = application_window_repository.get_by_title_and_application_id(conn=db_connection,
+                                                                                       title=window_title,
+                                                                                       application_id=application.db_id)
+
+    # We couldn't find an existing entry in the database. Insert a new one.
+    if application_window is None:
+        logging.info("Adding new application window")
+        application_window = ApplicationWindow(title=window_title, application=application)
+        db_id = application_window_repository.insert(conn=db_connection, application_window=application_window)
+        application_window.db_id = db_id
+
+    application_window_cache.put(cache_key, application_window)
     logging.debug(f"application_window_id = {application_window.db_id}")
     return application_window
 
 
-def insert_if_needed_and_get_application(application_name: str, application_path: ApplicationPath) -> Application:
-    with database_helper.create_connection() as db_connection:
-        application_repository = ApplicationRepository()
-        application = application_repository.get_by_name_and_path_id(conn=db_connection,
-                                                                     name=application_name,
-                                                                     path_id=application_path.db_id)
+def insert_if_needed_and_get_application(db_connection: sqlite3.Connection, application_name: str,
+                                         application_path: ApplicationPath) -> Application:
+    cache_key = (application_name, application_path.db_id)
+    application = application_cache.get(cache_key)
+    if application is not None:
+        return application
+
+    application_repository = ApplicationRepository()
+    application = application_repository.get_by_name_and_path_id(conn=db_connection,
+                                                                 name=application_name,
+                                                                 path_id=application_path.db_id)
 
-        # We couldn't find an existing entry in the database. Insert a new one.
-        if application is None:
-            logging.info("Adding new application")
-            application_id = application_repository.insert(conn=db_connection,
-                                                           name=application_name,
-                                                           application_path=application_path)
-            application = application_repository.get(db_connection, application_id)
+    # We couldn't find an existing entry in the database. Insert a new one.
+    if application is None:
+        logging.info("Adding new application")
+        application_id = application_repository.insert(conn=db_connection,
+                                                       name=application_name,
+                                                       application_path=application_path)
+        application = Application(name=application_name, application_path=application_path,
+                                  db_id=application_id)
 
+    application_cache.put(cache_key, application)
     logging.debug(f"application_id = {application.db_id}")
     return application
 
 
-def insert_if_needed_and_get_application_path(application_path: str) -> ApplicationPath:
-    with database_helper.create_connection() as db_connection:
-        application_path_repository = ApplicationPathRepository()
-        ap = application_path_repository.get_by_path(conn=db_connection, path=str(application_path))
+def insert_if_needed_and_get_application_path(db_connection: sqlite3.Connection,
+                                              application_path: str) -> ApplicationPath:
+    cache_key = str(application_path)
+    ap = application_path_cache.get(cache_key)
+    if ap is not None:
+        return ap
 
-        # We couldn't find an existing entry in the database. Insert a new one.
-        if ap is None:
-            logging.info("Adding new application path")
-            application_path_id = application_path_repository.insert(db_connection, str(application_path))
-        else:
-            application_path_id = ap.db_id
-        application_path = application_path_repository.get(conn=db_connection, db_id=application_path_id)
+    application_path_repository = ApplicationPathRepository()
+    ap = application_path_repository.get_by_path(conn=db_connection, path=cache_key)
+
+    # We couldn't find an existing entry in the database. Insert a new one.
+    if ap is None:
+        logging.info("Adding new application path")
+        application_path_id = application_path_repository.insert(db_connection, cache_key)
+        ap = ApplicationPath(path=cache_key, db_id=application_path_id)
 
-    return application_path
+    application_path_cache.put(cache_key, ap)
+    return ap
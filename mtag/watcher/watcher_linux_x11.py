@@ -1,10 +1,13 @@
 import ctypes.util
 import logging
 import os
-import re
-import subprocess
+import select
+import time
+from typing import Optional, Tuple
 
-from . import watcher_helper
+from . import logind_lock_state, watcher_helper
+from .process_metadata import ProcessMetadata, get_process_metadata
+from .watcher_session import WatcherSession
 
 
 class XScreenSaverInfo(ctypes.Structure):
@@ -16,11 +19,55 @@ class XScreenSaverInfo(ctypes.Structure):
                 ('event_mask', ctypes.c_ulong)]  # events
 
 
+class XPropertyEvent(ctypes.Structure):
+    _fields_ = [('type', ctypes.c_int),
+                ('serial', ctypes.c_ulong),
+                ('send_event', ctypes.c_int),
+                ('display', ctypes.c_void_p),
+                ('window', ctypes.c_ulong),
+                ('atom', ctypes.c_ulong),
+                ('time', ctypes.c_ulong),
+                ('state', ctypes.c_int)]
+
+
+class XEvent(ctypes.Union):
+    _fields_ = [('type', ctypes.c_int),
+                ('xproperty', XPropertyEvent),
+                ('pad', ctypes.c_long * 24)]
+
+
+# Constants from X.h and Xatom.h
+SUCCESS = 0
+ANY_PROPERTY_TYPE = 0
+PROPERTY_NOTIFY = 28
+NO_EVENT_MASK = 0
+PROPERTY_CHANGE_MASK = 1 << 22
+MAX_PROPERTY_LENGTH = 1024
+
+XErrorHandler = ctypes.CFUNCTYPE(ctypes.c_int, ctypes.c_void_p, ctypes.c_void_p)
+
 xlib_str = ctypes.util.find_library('X11')
 xlib = ctypes.cdll.LoadLibrary(xlib_str)
 
 xlib.XOpenDisplay.argtypes = [ctypes.c_char_p]
-xlib.XOpenDisplay.restypes = ctypes.c_void_p
+xlib.XOpenDisplay.restype = ctypes.c_void_p
+xlib.XDefaultRootWindow.argtypes = [ctypes.c_void_p]
+xlib.XDefaultRootWindow.restype = ctypes.c_ulong
+xlib.XConnectionNumber.argtypes = [ctypes.c_void_p]
+xlib.XInternAtom.argtypes = [ctypes.c_void_p, ctypes.c_char_p, ctypes.c_int]
+xlib.XInternAtom.restype = ctypes.c_ulong
+xlib.XGetWindowProperty.argtypes = [ctypes.c_void_p, ctypes.c_ulong, ctypes.c_ulong, ctypes.c_long, ctypes.c_long,
+                                    ctypes.c_int, ctypes.c_ulong, ctypes.POINTER(ctypes.c_ulong),
+                                    ctypes.POINTER(ctypes.c_int), ctypes.POINTER(ctypes.c_ulong),
+                                    ctypes.POINTER(ctypes.c_ulong), ctypes.POINTER(ctypes.c_void_p)]
+xlib.XFree.argtypes = [ctypes.c_void_p]
+xlib.XSelectInput.argtypes = [ctypes.c_void_p, ctypes.c_ulong, ctypes.c_long]
+xlib.XFlush.argtypes = [ctypes.c_void_p]
+xlib.XPending.argtypes = [ctypes.c_void_p]
+xlib.XNextEvent.argtypes = [ctypes.c_void_p, ctypes.POINTER(XEvent)]
+xlib.XSetErrorHandler.argtypes = [XErrorHandler]
+xlib.XSetErrorHandler.restype = ctypes.c_void_p
+
 dpy = xlib.XOpenDisplay(os.environ["DISPLAY"].encode("utf-8"))
 
 root = xlib.XDefaultRootWindow(dpy)
@@ -28,9 +75,34 @@ xss_str = ctypes.util.find_library('Xss')
 xss = ctypes.cdll.LoadLibrary(xss_str)
 logging.debug("Loaded XSS")
 xss.XScreenSaverAllocInfo.restype = ctypes.POINTER(XScreenSaverInfo)
+xss.XScreenSaverQueryInfo.argtypes = [ctypes.c_void_p, ctypes.c_ulong, ctypes.POINTER(XScreenSaverInfo)]
 xss_info = xss.XScreenSaverAllocInfo()
 
 
+@XErrorHandler
+def _ignore_x_error(_display, _error_event) -> int:
+    # The default handler exits the process. Errors are expected
+    # when a window is destroyed while we are reading its properties.
+    logging.debug("Ignoring an X error")
+    return 0
+
+
+xlib.XSetErrorHandler(_ignore_x_error)
+
+net_active_window_atom = xlib.XInternAtom(dpy, b"_NET_ACTIVE_WINDOW", False)
+net_wm_pid_atom = xlib.XInternAtom(dpy, b"_NET_WM_PID", False)
+net_wm_name_atom = xlib.XInternAtom(dpy, b"_NET_WM_NAME", False)
+wm_name_atom = xlib.XInternAtom(dpy, b"WM_NAME", False)
+wm_class_atom = xlib.XInternAtom(dpy, b"WM_CLASS", False)
+utf8_string_atom = xlib.XInternAtom(dpy, b"UTF8_STRING", False)
+
+# Get notified when the active window changes, and when the title of the active window changes
+xlib.XSelectInput(dpy, root, PROPERTY_CHANGE_MASK)
+xlib.XFlush(dpy)
+x_connection_fd = xlib.XConnectionNumber(dpy)
+watched_window = 0
+
+
 def get_idle_time():
     global xss, dpy, xss_info
     xss.XScreenSaverQueryInfo(dpy, root, xss_info)
@@ -38,100 +110,197 @@ def get_idle_time():
     return idle_seconds
 
 
-whoiam = subprocess.run(["whoami"], stdout=subprocess.PIPE, universal_newlines=True).stdout.strip()
-session_id = subprocess.run(["loginctl", "show-user", "-pSessions", "--value", whoiam],
-                            stdout=subprocess.PIPE, universal_newlines=True).stdout.strip()
+lock_state_provider = None
 
-logging.debug(f"{whoiam} => {session_id}")
 
+def get_locked_state() -> bool:
+    global lock_state_provider
+    if lock_state_provider is None:
+        lock_state_provider = logind_lock_state.create_lock_state_provider()
+    return lock_state_provider.is_locked()
 
-def get_locked_state():
-    global session_id
-    locked_hint = subprocess.run(["loginctl", "show-session", "-pLockedHint", "--value", session_id],
-                                 stdout=subprocess.PIPE).stdout.strip()
-    if locked_hint.lower() == b"no":
-        logging.debug("Not locked")
-        return False
-    elif locked_hint.lower() == b"yes":
-        logging.debug("Locked")
-        return True
-    else:
-        logging.debug("Unknown lock hint:", locked_hint)
-        return False
 
+def _get_window_property(window: int, property_atom: int) -> Optional[Tuple[int, int, bytes]]:
+    actual_type = ctypes.c_ulong()
+    actual_format = ctypes.c_int()
+    number_of_items = ctypes.c_ulong()
+    bytes_after = ctypes.c_ulong()
+    data = ctypes.c_void_p()
+    status = xlib.XGetWindowProperty(dpy, window, property_atom, 0, MAX_PROPERTY_LENGTH, False, ANY_PROPERTY_TYPE,
+                                     ctypes.byref(actual_type), ctypes.byref(actual_format),
+                                     ctypes.byref(number_of_items), ctypes.byref(bytes_after), ctypes.byref(data))
+    try:
+        if status != SUCCESS or actual_format.value == 0 or number_of_items.value == 0:
+            return None
 
-# Ensure that we get the value on the right. As a double quote might be escaped
-# inside of the left hand side, ensure that we match the correct double quote characters.
-wm_class_name_pattern = re.compile(r'[^\\]",\s*"\s*(.*)\s*"$')
+        # Items of format 32 are stored as C longs on the client side
+        item_size = ctypes.sizeof(ctypes.c_long) if actual_format.value == 32 else actual_format.value // 8
+        return actual_type.value, actual_format.value, ctypes.string_at(data, number_of_items.value * item_size)
+    finally:
+        if data:
+            xlib.XFree(data)
 
 
-def watch() -> None:
-    logging.info("== STARTED ==")
+def _get_window_number_property(window: int, property_atom: int) -> Optional[int]:
+    window_property = _get_window_property(window, property_atom)
+    if window_property is None or window_property[1] != 32:
+        return None
+
+    return ctypes.c_ulong.from_buffer_copy(window_property[2]).value
+
+
+def _get_window_text_property(window: int, property_atom: int) -> Optional[str]:
+    window_property = _get_window_property(window, property_atom)
+    if window_property is None or window_property[1] != 8:
+        return None
+
+    # Only UTF8_STRING properties are UTF-8. STRING, which legacy applications use for
+    # WM_NAME and which WM_CLASS always is, is Latin-1, as is the base of COMPOUND_TEXT.
+    property_type, _, value = window_property
+    encoding = "utf-8" if property_type == utf8_string_atom else "latin-1"
+    return value.decode(encoding, errors="replace")
+
+
+def get_active_window() -> int:
+    active_window = _get_window_number_property(root, net_active_window_atom)
+    return 0 if active_window is None else active_window
+
+
+def get_window_title(window: int) -> Optional[str]:
+    title = _get_window_text_property(window, net_wm_name_atom)
+    if title is None:
+        title = _get_window_text_property(window, wm_name_atom)
+    return title
+
 
-    active_window_id_information = subprocess.run(["xprop", "-root", "_NET_ACTIVE_WINDOW"],
-                                                  stdout=subprocess.PIPE, universal_newlines=True,
-                                                  encoding="UTF-8").stdout
-    logging.debug(active_window_id_information)
+def get_window_class_name(window: int) -> Optional[str]:
+    # WM_CLASS contains the instance name and the class name, both NUL terminated.
+    # The class name is the one that is used as the application name.
+    wm_class = _get_window_text_property(window, wm_class_atom)
+    if wm_class is None:
+        return None
 
-    active_window_id = active_window_id_information[active_window_id_information.rfind(" ") + 1:].strip()
+    names = wm_class.split("\0")
+    if len(names) < 2 or len(names[1]) == 0:
+        logging.debug("Unable to extract the class name from WM_CLASS.")
+        return None
+    return names[1]
+
+
+def get_process_start_time(pid: int) -> Optional[int]:
+    try:
+        with open(f"/proc/{pid}/stat", "rb") as stat_file:
+            stat = stat_file.read()
+    except OSError:
+        return None
+
+    # The command name may contain spaces and parentheses, so only split what comes after it.
+    # The start time is the 22nd field, and the fields after the command name start at the 3rd.
+    fields = stat[stat.rindex(b")") + 2:].split()
+    return int(fields[22 - 3])
+
+
+def read_process_metadata(pid: int) -> ProcessMetadata:
+    try:
+        with open(f"/proc/{pid}/cmdline", "rb") as cmdline_file:
+            cmdline = cmdline_file.read()
+    except OSError:
+        cmdline = b""
+
+    application_path = cmdline.decode("utf-8", errors="replace").replace("\0", " ").strip()
+    if len(application_path) == 0:
+        # Some processes, e.g. zombies, have no command line
+        try:
+            application_path = os.readlink(f"/proc/{pid}/exe")
+        except OSError:
+            application_path = None
+
+    return ProcessMetadata(application_path=application_path, application_name=None)
+
+
+def _watch_window(window: int) -> None:
+    global watched_window
+    if window == watched_window:
+        return
+
+    if watched_window != 0:
+        xlib.XSelectInput(dpy, watched_window, NO_EVENT_MASK)
+    if window != 0:
+        xlib.XSelectInput(dpy, window, PROPERTY_CHANGE_MASK)
+    xlib.XFlush(dpy)
+    watched_window = window
+
+
+def _handle_pending_events() -> bool:
+    event = XEvent()
+    window_changed = False
+    while xlib.XPending(dpy) > 0:
+        xlib.XNextEvent(dpy, ctypes.byref(event))
+        if event.type != PROPERTY_NOTIFY:
+            continue
+
+        property_event = event.xproperty
+        if property_event.window == root and property_event.atom == net_active_window_atom:
+            window_changed = True
+        elif property_event.window == watched_window and property_event.atom in (net_wm_name_atom, wm_name_atom):
+            window_changed = True
+    return window_changed
+
+
+def wait_for_change(timeout: float) -> bool:
+    deadline = time.monotonic() + timeout
+    while True:
+        if _handle_pending_events():
+            logging.debug("The active window or its title changed")
+            return True
+
+        remaining_time = deadline - time.monotonic()
+        if remaining_time <= 0:
+            return False
+
+        readable, _, _ = select.select([x_connection_fd], [], [], remaining_time)
+        if len(readable) == 0:
+            return False
+
+
+def watch(session: WatcherSession) -> None:
+    logging.info("== STARTED ==")
+
+    active_window_id = get_active_window()
     logging.debug(active_window_id)
+    _watch_window(active_window_id)
     idle_seconds = get_idle_time()
 
     locked_state = get_locked_state()
 
     # If the window handle id is 0, then make a logged entry with default values
-    if active_window_id == "0x0":
+    if active_window_id == 0:
         logging.info("No active window.")
-        watcher_helper.register(window_title=None,
+        watcher_helper.register(session=session,
+                                window_title=None,
                                 application_name=None,
                                 application_path=None,
                                 idle_period=idle_seconds,
                                 locked_state=locked_state)
         return
 
-    active_window_x11_information = subprocess.run(["xprop", "-id", active_window_id,
-                                                    "_NET_WM_PID", "WM_CLASS", "WM_NAME", "_NET_WM_NAME"],
-                                                   stdout=subprocess.PIPE, universal_newlines=True,
-                                                   encoding="UTF-8").stdout.strip()
-    logging.debug(active_window_x11_information)
-
-    application_pid = None
-    application_name = None
-    active_window_title = None
-    for line in active_window_x11_information.splitlines():
-        if line.startswith("_NET_WM_PID"):
-            application_pid = line[line.find("=") + 2:]
-            logging.debug(application_pid)
-        elif line.startswith("_NET_WM_NAME"):
-            active_window_title = line[line.find("=") + 2:].strip('"')
-            logging.debug(active_window_title)
-        elif line.startswith("WM_NAME"):
-            # Do not parse this if we already got a value
-            if active_window_title is not None:
-                logging.debug("Application window title already set")
-                continue
-            application_window_title = line[line.find("=") + 2:].strip('"')
-            logging.debug(application_window_title)
-        elif line.startswith("WM_CLASS"):
-            global wm_class_name_pattern
-            pattern_matches = wm_class_name_pattern.findall(line)
-            if len(pattern_matches) > 0:
-                application_name = pattern_matches[0]
-            else:
-                logging.debug("Unable to extract the right hand side WM_CLASS value.")
-
+    application_pid = _get_window_number_property(active_window_id, net_wm_pid_atom)
     logging.debug(application_pid)
+    active_window_title = get_window_title(active_window_id)
+    logging.debug(active_window_title)
+    application_name = get_window_class_name(active_window_id)
+    logging.debug(application_name)
 
     application_path = None
-    if application_pid.isdigit() and application_pid != 0:
+    if application_pid is not None and application_pid != 0:
         logging.debug(f"We have an application id: {application_pid}")
-        application_path = subprocess.run(["cat", f"/proc/{int(application_pid)}/cmdline"],
-                                          stdout=subprocess.PIPE, universal_newlines=True,
-                                          encoding="UTF-8").stdout
-        application_path = application_path.replace("\0", " ")
-        application_path = application_path.strip()
+        process_metadata = get_process_metadata(pid=application_pid,
+                                                start_time=get_process_start_time(application_pid),
+                                                read_process_metadata=lambda: read_process_metadata(application_pid))
+        application_path = process_metadata.application_path
 
-    watcher_helper.register(window_title=active_window_title,
+    watcher_helper.register(session=session,
+                            window_title=active_window_title,
                             application_name=application_name,
                             application_path=application_path,
                             idle_period=idle_seconds,
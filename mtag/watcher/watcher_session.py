@@ -0,0 +1,61 @@
+import datetime
+import logging
+import sqlite3
+from typing import Optional
+
+from mtag.entity import ActivityEntry, OpenLoggedEntry
+from mtag.helper import database_helper
+from mtag.helper.configuration_helper import Configuration
+
+
+class WatcherSession:
+    def __init__(self):
+        self._connection: Optional[sqlite3.Connection] = None
+        self._maintenance_date: Optional[datetime.date] = None
+
+        # The entries currently being extended. They are only read from the database
+        # when the session starts, and their stops may be ahead of what is stored
+        # in the database when the writes are deferred.
+        self.open_logged_entry: Optional[OpenLoggedEntry] = None
+        self.open_activity_entry: Optional[ActivityEntry] = None
+        self.has_unflushed_updates = False
+        self.last_flush = datetime.datetime.now()
+
+        # The state of the latest sample. The configuration is the one it was made with,
+        # which is kept when the configuration file can't be read.
+        self.configuration = Configuration(**Configuration.default_configuration)
+        self.idle_period = 0
+        self.locked_state = False
+        self.database_seconds = 0.0
+
+    def get_connection(self) -> sqlite3.Connection:
+        if self._connection is None:
+            logging.info("Opening the watcher database connection")
+            self._connection = database_helper.open_connection()
+
+        # Backups, purging and migrations only need to be done once per day
+        today = datetime.date.today()
+        if self._maintenance_date != today:
+            database_helper.run_maintenance(conn=self._connection)
+            self._maintenance_date = today
+
+        return self._connection
+
+    def is_flush_due(self, datetime_now: datetime.datetime, write_behind_seconds: int) -> bool:
+        if not self.has_unflushed_updates:
+            return False
+
+        return datetime.timedelta(seconds=write_behind_seconds) <= datetime_now - self.last_flush
+
+    def forget_open_entries(self) -> None:
+        self.open_logged_entry = None
+        self.open_activity_entry = None
+        self.has_unflushed_updates = False
+
+    def close(self) -> None:
+        if self._connection is None:
+            return
+
+        self._connection.close()
+        self._connection = None
+        self._maintenance_date = None
@@ -3,10 +3,14 @@ from collections import namedtuple
 from ctypes import *
 import subprocess
 import logging
+import time
 from ctypes import cast
-from ctypes.wintypes import HANDLE, MAX_PATH, DWORD
+from ctypes.wintypes import HANDLE, MAX_PATH, DWORD, FILETIME
+from typing import Optional
 
 from . import watcher_helper
+from .process_metadata import ProcessMetadata, get_process_metadata
+from .watcher_session import WatcherSession
 
 
 class LASTINPUTINFO(Structure):
@@ -55,7 +59,84 @@ def get_locked_state():
 PROCESS_QUERY_INFORMATION = 0x0400
 
 
-def watch():
+def wait_for_change(timeout: float) -> bool:
+    # There are no focus change notifications here, so just wait for the next sample
+    time.sleep(timeout)
+    return False
+
+
+def get_process_creation_time(process_handle: HANDLE) -> Optional[int]:
+    creation_time = FILETIME()
+    exit_time = FILETIME()
+    kernel_time = FILETIME()
+    user_time = FILETIME()
+    result = windll.kernel32.GetProcessTimes(process_handle, byref(creation_time), byref(exit_time),
+                                             byref(kernel_time), byref(user_time))
+    if result == 0:
+        return None
+
+    return (creation_time.dwHighDateTime << 32) | creation_time.dwLowDateTime
+
+
+def read_process_metadata(process_handle: HANDLE) -> ProcessMetadata:
+    image_name = create_unicode_buffer(MAX_PATH)
+    max_path_as_dword = DWORD(MAX_PATH*16)
+    result = windll.kernel32.QueryFullProcessImageNameW(process_handle, 0,
+                                                        image_name, byref(max_path_as_dword))
+    if result == 0:
+        raise OSError("Unable to find the application path")
+
+    application_path = image_name.value
+    logging.debug(application_path)
+
+    application_name = None
+    try:
+        application_name = read_application_name(image_name)
+    except Exception as ex:
+        logging.error(f"Unable to read the application name of {application_path}: {ex}")
+
+    return ProcessMetadata(application_path=application_path, application_name=application_name)
+
+
+def read_application_name(image_name) -> Optional[str]:
+    # Get the file version info
+    file_version_info_size = windll.version.GetFileVersionInfoSizeW(image_name, None)
+    file_version_info_data = create_string_buffer(file_version_info_size)
+    windll.version.GetFileVersionInfoW(image_name, None,
+                                       file_version_info_size, byref(file_version_info_data))
+
+    query_value_p = c_void_p(0)
+    query_value_length = c_uint()
+    windll.version.VerQueryValueW(file_version_info_data, "\\\\VarFileInfo\\Translation",
+                                  byref(query_value_p), byref(query_value_length))
+    value_as_lacp = cast(query_value_p, POINTER(LANGANDCODEPAGE))
+    language = f"{value_as_lacp.contents.wLanguage:04x}{value_as_lacp.contents.wCodePage:04x}"
+
+    query_value_p = c_void_p(0)
+    for info in ["FileDescription", "OriginalFilename", "ProductName"]:
+        ver_res = windll.version.VerQueryValueW(file_version_info_data,
+                                                f"\\StringFileInfo\\{language}\\{info}",
+                                                byref(query_value_p), byref(query_value_length))
+        # Go to the next potential value if we got an error
+        if ver_res == 0:
+            continue
+
+        current_value = wstring_at(query_value_p.value, query_value_length.value)
+        # We really shouldn't need to, but I've seen some names with
+        # a NUL character in them which then also includes e.g. the file version.
+        # This happened with e.g. IBM Notes.
+        if "\0" in current_value:
+            current_value = current_value[0:current_value.index("\0")]
+
+        # Ensure that we've got at least something as a value
+        if 0 < len(current_value):
+            logging.debug(f"Setting application name to {current_value}, fetched from {info}")
+            return current_value
+
+    return None
+
+
+def watch(session: WatcherSession):
     logging.info("== STARTED ==")
 
     pid_param = c_ulong()
@@ -66,7 +147,8 @@ def watch():
     active_window_title = None
 
     if locked_state:
-        watcher_helper.register(window_title=active_window_title,
+        watcher_helper.register(session=session,
+                                window_title=active_window_title,
                                 application_name=application_name,
                                 application_path=application_path,
                                 idle_period=idle_period,
@@ -92,59 +174,24 @@ def watch():
         windll.user32.GetWindowThreadProcessId(window_handle, byref(pid_param))
         logging.debug(f"Got process ID: {pid_param.value}")
 
-        # Get the path of the process exe
+        # Get the path and name of the process exe, which only needs to be done once per process
         process_handle: HANDLE = windll.kernel32.OpenProcess(PROCESS_QUERY_INFORMATION,
                                                              False, pid_param)
-        image_name = create_unicode_buffer(MAX_PATH)
-        max_path_as_dword = DWORD(MAX_PATH*16)
-        result = windll.kernel32.QueryFullProcessImageNameW(process_handle, 0,
-                                                            image_name, byref(max_path_as_dword))
-        if result == 0:
-            raise OSError("Unable to find the application path")
-
-        application_path = image_name.value
-        logging.debug(application_path)
-
-        # Get the file version info
-        file_version_info_size = windll.version.GetFileVersionInfoSizeW(image_name, None)
-        file_version_info_data = create_string_buffer(file_version_info_size)
-        windll.version.GetFileVersionInfoW(image_name, None,
-                                           file_version_info_size, byref(file_version_info_data))
-
-        query_value_p = c_void_p(0)
-        query_value_length = c_uint()
-        windll.version.VerQueryValueW(file_version_info_data, "\\\\VarFileInfo\\Translation",
-                                      byref(query_value_p), byref(query_value_length))
-        value_as_lacp = cast(query_value_p, POINTER(LANGANDCODEPAGE))
-        language = f"{value_as_lacp.contents.wLanguage:04x}{value_as_lacp.contents.wCodePage:04x}"
-
-        query_value_p = c_void_p(0)
-        for info in ["FileDescription", "OriginalFilename", "ProductName"]:
-            ver_res = windll.version.VerQueryValueW(file_version_info_data,
-                                                    f"\\StringFileInfo\\{language}\\{info}",
-                                                    byref(query_value_p), byref(query_value_length))
-            # Go to the next potential value if we got an error
-            if ver_res == 0:
-                continue
-
-            current_value = wstring_at(query_value_p.value, query_value_length.value)
-            # We really shouldn't need to, but I've seen some names with
-            # a NUL character in them which then also includes e.g. the file version.
-            # This happened with e.g. IBM Notes.
-            if "\0" in current_value:
-                current_value = current_value[0:current_value.index("\0")]
-
-            # Ensure that we've got at least something as a value
-            if 0 < len(current_value):
-                logging.debug(f"Setting application name to {current_value}, fetched from {info}")
-                application_name = current_value
-                break
-
+        try:
+            process_metadata = get_process_metadata(pid=pid_param.value,
+                                                    start_time=get_process_creation_time(process_handle),
+                                                    read_process_metadata=lambda: read_process_metadata(process_handle))
+        finally:
+            windll.kernel32.CloseHandle(process_handle)
+
+        application_path = process_metadata.application_path
+        application_name = process_metadata.application_name
         logging.debug(application_name)
     except Exception as ex:
         logging.error(f"An unhandled error occurred in the Windows watcher: {ex}")
 
-    watcher_helper.register(window_title=active_window_title,
+    watcher_helper.register(session=session,
+                            window_title=active_window_title,
                             application_name=application_name,
                             application_path=application_path,
                             idle_period=idle_period,
@@ -156,19 +156,21 @@ class CategoryPage(Gtk.Box):
         if self.current_category is None:
             return
 
+        # The shown category is shared by everything that has read it, so the changes
+        # are made to a copy, which doesn't leave anything behind if the update fails
+        edited_category = Category(name=self.name_entry.get_text(), url=self.url_entry.get_text(),
+                                   db_id=self.current_category.db_id, parent_id=self.current_category.parent_id)
+
         chosen_parent_name = self.parent_list.get_active_text()
         if chosen_parent_name is not None:
             for (_, holder) in self.categories.items():
                 if holder.main.name == chosen_parent_name:
-                    self.current_category.parent_id = holder.main.db_id
+                    edited_category.parent_id = holder.main.db_id
                     break
 
-        self.current_category.name = self.name_entry.get_text()
-        self.current_category.url = self.url_entry.get_text()
-
         cr = CategoryRepository()
         with database_helper.create_connection() as conn:
-            cr.update(conn=conn, category=self.current_category)
+            cr.update(conn=conn, category=edited_category)
 
         self.update_page()
 
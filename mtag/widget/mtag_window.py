@@ -1,5 +1,6 @@
 import logging
 
+from mtag.helper import database_helper
 from . import CategoryPage, SettingPage, TimelinePage
 
 import gi
@@ -20,6 +21,10 @@ class MTagWindow(Gtk.Window):
 
         self.connect("destroy", Gtk.main_quit)
 
+        # The database is created, backed up and updated once, here on the main thread,
+        # before the pages start reading it through read-only connections on their own threads
+        database_helper.create_connection().close()
+
         timeline_page = TimelinePage(parent=self)
         category_page = CategoryPage(parent=self)
         setting_page = SettingPage()
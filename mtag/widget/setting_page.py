@@ -52,6 +52,41 @@ class SettingPage(Gtk.Bin):
         vbox.pack_start(self.log_application_path_switch, expand=False, fill=False, padding=0)
         grid.attach(vbox, 1, 2, 1, 1)
 
+        # Seconds between the watcher's database writes
+        write_behind_seconds_label = Gtk.Label(label="Seconds between database writes (0 = every sample)")
+        write_behind_seconds_label.set_xalign(1)
+        grid.attach(write_behind_seconds_label, 0, 3, 1, 1)
+        adjustment = Gtk.Adjustment(value=configuration.write_behind_seconds,
+                                    lower=0, upper=600,
+                                    step_incr=1, page_incr=1, page_size=1)
+        self.write_behind_seconds = Gtk.SpinButton(adjustment=adjustment)
+        self.write_behind_seconds.set_value(adjustment.get_value())
+        self.write_behind_seconds.connect("value-changed", self._save_configuration)
+        grid.attach(self.write_behind_seconds, 1, 3, 1, 1)
+
+        # Sampling interval of the watcher
+        min_sampling_interval_label = Gtk.Label(label="Seconds between samples when active")
+        min_sampling_interval_label.set_xalign(1)
+        grid.attach(min_sampling_interval_label, 0, 4, 1, 1)
+        adjustment = Gtk.Adjustment(value=configuration.min_sampling_interval_seconds,
+                                    lower=1, upper=60,
+                                    step_incr=1, page_incr=1, page_size=1)
+        self.min_sampling_interval_seconds = Gtk.SpinButton(adjustment=adjustment)
+        self.min_sampling_interval_seconds.set_value(adjustment.get_value())
+        self.min_sampling_interval_seconds.connect("value-changed", self._save_configuration)
+        grid.attach(self.min_sampling_interval_seconds, 1, 4, 1, 1)
+
+        max_sampling_interval_label = Gtk.Label(label="Seconds between samples when idle or locked")
+        max_sampling_interval_label.set_xalign(1)
+        grid.attach(max_sampling_interval_label, 0, 5, 1, 1)
+        adjustment = Gtk.Adjustment(value=configuration.max_sampling_interval_seconds,
+                                    lower=1, upper=600,
+                                    step_incr=1, page_incr=1, page_size=1)
+        self.max_sampling_interval_seconds = Gtk.SpinButton(adjustment=adjustment)
+        self.max_sampling_interval_seconds.set_value(adjustment.get_value())
+        self.max_sampling_interval_seconds.connect("value-changed", self._save_configuration)
+        grid.attach(self.max_sampling_interval_seconds, 1, 5, 1, 1)
+
         self.add(grid)
 
     def update_page(self):
@@ -59,12 +94,21 @@ class SettingPage(Gtk.Bin):
         self.seconds_before_new_entry.set_value(configuration.seconds_before_new_entry)
         self.inactive_after_idle_sec.set_value(configuration.inactive_after_idle_seconds)
         self.log_application_path_switch.set_active(configuration.log_application_path)
+        self.write_behind_seconds.set_value(configuration.write_behind_seconds)
+        self.min_sampling_interval_seconds.set_value(configuration.min_sampling_interval_seconds)
+        self.max_sampling_interval_seconds.set_value(configuration.max_sampling_interval_seconds)
 
     def _save_configuration(self, *_):
         sec_before_new_entry = int(self.seconds_before_new_entry.get_value())
         inactive_after_idle_sec = int(self.inactive_after_idle_sec.get_value())
         log_app_path = self.log_application_path_switch.get_active()
+        write_behind_sec = int(self.write_behind_seconds.get_value())
+        min_sampling_interval_sec = int(self.min_sampling_interval_seconds.get_value())
+        max_sampling_interval_sec = int(self.max_sampling_interval_seconds.get_value())
         configuration = Configuration(inactive_after_idle_seconds=inactive_after_idle_sec,
                                       seconds_before_new_entry=sec_before_new_entry,
-                                      log_application_path=log_app_path)
+                                      log_application_path=log_app_path,
+                                      write_behind_seconds=write_behind_sec,
+                                      min_sampling_interval_seconds=min_sampling_interval_sec,
+                                      max_sampling_interval_seconds=max_sampling_interval_sec)
         configuration_helper.update_configuration(configuration)
@@ -8,7 +8,8 @@ import gi
 
 from mtag import entity
 from mtag.entity import TaggedEntry, LoggedEntry, ActivityEntry
-from mtag.helper import color_helper, database_helper
+from mtag.helper import database_helper, datetime_helper, timeline_column_helper
+from mtag.helper.timeline_column_helper import TimelineColumns
 from mtag.helper.timeline_helper import TimelineHelper
 from mtag.repository import CategoryRepository
 from mtag.widget import CategoryChoiceDialog, TimelineContextPopover
@@ -22,6 +23,8 @@ TimelineTimeline = namedtuple("TimelineTimeline", ["time", "x", "text", "text_ex
 
 
 class TimelineEntry:
+    __slots__ = ("entry", "color", "start_x", "stop_x", "width", "start_y", "height")
+
     def __init__(self, entry: Union[TaggedEntry, LoggedEntry, ActivityEntry], color: Tuple):
         self.entry = entry
         self.color = color
@@ -118,18 +121,21 @@ class TimelineCanvas(Gtk.DrawingArea):
 
         self._current_date = self.timeline_start
         self.current_tagged_entry: Optional[entity.TaggedEntry] = None
-        self.tagged_entries: List[TimelineEntry] = []
-        self.logged_entries: List[TimelineEntry] = []
-        self.activity_entries: List[TimelineEntry] = []
+        self.tagged_columns = TimelineColumns()
+        self.logged_columns = TimelineColumns()
+        self.activity_columns = TimelineColumns()
 
         self.zoom_state: Optional[ZoomState] = None
 
-        self.visible_activity_entries: List[TimelineEntry] = []
-        self.visible_tagged_entries: List[TimelineEntry] = []
-        self.visible_logged_entries: List[TimelineEntry] = []
+        self.visible_logged_x_positions: List[Tuple[int, int]] = []
         self.time_text_extents = {}
 
-        self.timeline_entries_by_color: DefaultDict = defaultdict(list)
+        self.rectangles_by_color: DefaultDict = defaultdict(list)
+
+        # The activity, hour lines and entries are only drawn again when something they depend on changes
+        self._entries_version = 0
+        self._static_layers_surface: Optional[cairo.ImageSurface] = None
+        self._static_layers_key: Optional[Tuple] = None
 
         self.context_menu = TimelineContextPopover(relative_to=self)
         self.context_menu.connect("tagged-entry-edit-category-event", self._do_context_menu_edit_category)
@@ -156,7 +162,9 @@ class TimelineCanvas(Gtk.DrawingArea):
             with database_helper.create_connection() as conn:
                 category_repository = CategoryRepository()
                 te.category = category_repository.insert(conn=conn, main_name=main_category, sub_name=sub_category)
-                self.emit("tagged-entry-edited", te)
+
+            # The new category has to be committed before the tagged entry is updated through another connection
+            self.emit("tagged-entry-edited", te)
 
     def zoom(self, zoom_in: bool, dt: Optional[datetime.datetime] = None) -> None:
         dt_to_use = dt
@@ -172,8 +180,8 @@ class TimelineCanvas(Gtk.DrawingArea):
         self._set_zoom_boundaries(new_start, new_stop)
 
     def zoom_to_fit(self) -> None:
-        number_of_logged_entries = len(self.logged_entries)
-        number_of_tagged_entries = len(self.tagged_entries)
+        number_of_logged_entries = len(self.logged_columns)
+        number_of_tagged_entries = len(self.tagged_columns)
 
         current_date_as_datetime = datetime.datetime(year=self._current_date.year,
                                                      month=self._current_date.month,
@@ -190,18 +198,19 @@ class TimelineCanvas(Gtk.DrawingArea):
         starts = []
         stops = []
         if number_of_logged_entries > 0:
-            starts.append(self.logged_entries[0].entry.start)
-            stops.append(self.logged_entries[number_of_logged_entries - 1].entry.stop)
+            starts.append(self.logged_columns.starts[0])
+            stops.append(self.logged_columns.stops[number_of_logged_entries - 1])
 
         if number_of_tagged_entries > 0:
-            starts.append(self.tagged_entries[0].entry.start)
-            stops.append(self.tagged_entries[number_of_tagged_entries - 1].entry.stop)
+            starts.append(self.tagged_columns.starts[0])
+            stops.append(self.tagged_columns.get_last_stop())
 
         # Choose the earliest start, but ensure that we are within today's date
-        new_start = max(current_date_as_datetime, min(starts))
+        new_start = max(current_date_as_datetime, datetime_helper.timestamp_to_datetime(min(starts)))
 
         # Choose the latest stop, but ensure that we are within today's date
-        new_stop = min(current_date_as_datetime.replace(hour=23, minute=59, second=59), max(stops))
+        new_stop = min(current_date_as_datetime.replace(hour=23, minute=59, second=59),
+                       datetime_helper.timestamp_to_datetime(max(stops)))
 
         self._set_zoom_boundaries(new_start, new_stop)
 
@@ -236,54 +245,40 @@ class TimelineCanvas(Gtk.DrawingArea):
             timelines_end = self.timeline_end
 
         # Reset the viewport states
-        self.visible_activity_entries.clear()
-        self.visible_logged_entries.clear()
-        self.visible_tagged_entries.clear()
-        self.timeline_entries_by_color.clear()
+        self.visible_logged_x_positions.clear()
+        self.rectangles_by_color.clear()
 
         self.timeline_helper = self._create_timeline_helper()
 
-        # Gather the visible activity entries
-        for ae in self.activity_entries:
-            ae_entry = ae.entry
-            if ae_entry.stop < timelines_start or timelines_end < ae_entry.start:
-                continue
-
-            ae.set_x_positions(self.timeline_helper.datetime_to_pixel(ae_entry.start),
-                               self.timeline_helper.datetime_to_pixel(ae_entry.stop))
-            self.visible_activity_entries.append(ae)
+        # Map the entries within the viewport to pixels
+        from_timestamp = datetime_helper.datetime_to_timestamp(timelines_start)
+        to_timestamp = datetime_helper.datetime_to_timestamp(timelines_end)
+        for columns in (self.activity_columns, self.logged_columns, self.tagged_columns):
+            columns.update_positions(timeline_helper=self.timeline_helper,
+                                     from_timestamp=from_timestamp, to_timestamp=to_timestamp)
 
         # Gather the visible logged entries
-        last_stop_x = None
-        self.visible_logged_entries = []
-        for le in self.logged_entries:
-            le_entry = le.entry
-
-            # Ensure that the entry is within the viewport
-            if le_entry.stop < timelines_start or timelines_end < le_entry.start:
-                continue
-
-            le.set_draw_positions(self.timeline_helper.datetime_to_pixel(le_entry.start),
-                                  self.timeline_helper.datetime_to_pixel(le_entry.stop),
-                                  self.le_start_y, self.timeline_height)
-
-            # If we end at the same x-position as before, there is no need to draw this entry as it would be hidden
-            if le.stop_x != last_stop_x:
-                self.visible_logged_entries.append(le)
-                self.timeline_entries_by_color[le.color].append(le)
-                last_stop_x = le.stop_x
+        logged_columns = self.logged_columns
+        if len(logged_columns.start_xs) > self.get_allocated_width():
+            # There are more entries than pixels, so only draw the dominant color of each pixel
+            for start_x, stop_x, color in logged_columns.get_pixel_runs(timeline_helper=self.timeline_helper,
+                                                                        from_timestamp=from_timestamp,
+                                                                        to_timestamp=to_timestamp):
+                self.visible_logged_x_positions.append((start_x, stop_x))
+                self.rectangles_by_color[color].append((start_x, stop_x, self.le_start_y))
+        else:
+            last_stop_x = None
+            for index, start_x, stop_x in logged_columns.iter_visible_positions():
+                # If we end at the same x-position as before, there is no need to draw this entry as it would be hidden
+                if stop_x != last_stop_x:
+                    self.visible_logged_x_positions.append((start_x, stop_x))
+                    self.rectangles_by_color[logged_columns.get_color(index)].append((start_x, stop_x, self.le_start_y))
+                    last_stop_x = stop_x
 
         # Gather the visible tagged entries
-        for te in self.tagged_entries:
-            te_entry = te.entry
-            if te_entry.stop < timelines_start or timelines_end < te_entry.start:
-                continue
-
-            te.set_draw_positions(self.timeline_helper.datetime_to_pixel(te_entry.start),
-                                  self.timeline_helper.datetime_to_pixel(te_entry.stop),
-                                  self.te_start_y, self.timeline_height)
-            self.visible_tagged_entries.append(te)
-            self.timeline_entries_by_color[te.color].append(te)
+        tagged_columns = self.tagged_columns
+        for index, start_x, stop_x in tagged_columns.iter_visible_positions():
+            self.rectangles_by_color[tagged_columns.get_color(index)].append((start_x, stop_x, self.te_start_y))
 
         window: Gdk.Window = self.get_root_window()
         cr: cairo.Context = window.cairo_create()
@@ -333,12 +328,10 @@ class TimelineCanvas(Gtk.DrawingArea):
 
     def set_entries(self, dt: datetime.datetime, logged_entries: List[LoggedEntry],
                     tagged_entries: List[TaggedEntry], activity_entries: List[ActivityEntry]) -> None:
-        self.logged_entries = [TimelineEntry(le, color_helper.to_color_floats(le.application_window.application.name))
-                               for le in logged_entries]
-        self.tagged_entries = [TimelineEntry(te, color_helper.to_color_floats(te.category_str))
-                               for te in tagged_entries]
-        self.activity_entries = [TimelineEntry(ae, color_helper.activity_to_color_floats(ae.active))
-                                 for ae in activity_entries]
+        self.logged_columns = timeline_column_helper.from_logged_entries(logged_entries)
+        self.tagged_columns = timeline_column_helper.from_tagged_entries(tagged_entries)
+        self.activity_columns = timeline_column_helper.from_activity_entries(activity_entries)
+        self._entries_version += 1
         self._current_date = dt
 
         self.timeline_start = self.timeline_start.replace(year=dt.year, month=dt.month, day=dt.day)
@@ -347,6 +340,14 @@ class TimelineCanvas(Gtk.DrawingArea):
         self._update_canvas_constants()
         self.queue_draw()
 
+    def add_entries(self, logged_entries: List[LoggedEntry], activity_entries: List[ActivityEntry]) -> None:
+        timeline_column_helper.add_logged_entries(columns=self.logged_columns, logged_entries=logged_entries)
+        timeline_column_helper.add_activity_entries(columns=self.activity_columns, activity_entries=activity_entries)
+        self._entries_version += 1
+
+        self._update_canvas_constants()
+        self.queue_draw()
+
     def set_boundaries(self, start: datetime.datetime, stop: datetime.datetime) -> None:
         self.timeline_start = start
         self.timeline_end = stop
@@ -362,16 +363,52 @@ class TimelineCanvas(Gtk.DrawingArea):
         # Get the size
         drawing_area_height = self.get_allocated_height()
         canvas_width = self.get_allocated_width()
+        scale_factor = self.get_scale_factor()
+
+        static_layers_key = (self.timeline_start, self.timeline_end, canvas_width, drawing_area_height,
+                             scale_factor, self._entries_version)
+        if self._static_layers_key != static_layers_key:
+            surface = cairo.ImageSurface(cairo.FORMAT_ARGB32, canvas_width * scale_factor,
+                                         drawing_area_height * scale_factor)
+            surface.set_device_scale(scale_factor, scale_factor)
+            self._draw_static_layers(cairo.Context(surface), canvas_width, drawing_area_height)
+            self._static_layers_surface = surface
+            self._static_layers_key = static_layers_key
+
+        cr.set_source_surface(self._static_layers_surface, 0, 0)
+        cr.paint()
+
+        if self.current_tagged_entry is not None:
+            start_x = self.timeline_helper.datetime_to_pixel(self.current_tagged_entry.start)
+            stop_x = self.timeline_helper.datetime_to_pixel(self.current_tagged_entry.stop)
+            cr.set_source_rgba(0.2, 0.2, 0.2, 0.4)
+            cr.rectangle(start_x, 0, stop_x - start_x, drawing_area_height)
+            cr.fill()
+        elif self.zoom_state is not None:
+            start_x = self.timeline_helper.datetime_to_pixel(self.zoom_state.get_start())
+            stop_x = self.timeline_helper.datetime_to_pixel(self.zoom_state.get_stop())
+            cr.set_source_rgba(0.2, 0.6, 0.2, 0.4)
+            cr.rectangle(start_x, 0, stop_x - start_x, drawing_area_height)
+            cr.fill()
 
+        # Draw the sides
+        cr.set_source_rgba(0.5, 0.5, 0.5, 0.5)
+        cr.rectangle(0, 0, self.timeline_side_padding, drawing_area_height)
+        cr.fill()
+        cr.rectangle(canvas_width - self.timeline_side_padding, 0, canvas_width, drawing_area_height)
+        cr.fill()
+
+    def _draw_static_layers(self, cr: cairo.Context, canvas_width: int, drawing_area_height: int):
         clip_start_x, _, clip_stop_x, _ = cr.clip_extents()
 
         # Show the activity as a background for the time area
-        for ae in self.visible_activity_entries:
-            if ae.stop_x < clip_start_x or clip_stop_x < ae.start_x:
+        activity_columns = self.activity_columns
+        for index, start_x, stop_x in activity_columns.iter_visible_positions():
+            if stop_x < clip_start_x or clip_stop_x < start_x:
                 continue
 
-            cr.set_source_rgb(*ae.color)
-            cr.rectangle(ae.start_x, 0, ae.width, drawing_area_height)
+            cr.set_source_rgb(*activity_columns.get_color(index))
+            cr.rectangle(start_x, 0, stop_x - start_x, drawing_area_height)
             cr.fill()
 
         # Draw the hour lines
@@ -400,66 +437,46 @@ class TimelineCanvas(Gtk.DrawingArea):
             cr.show_text(timeline_timeline.text)
 
         # Draw the rectangles for the entries by colors
-        for color, drawing_entries in self.timeline_entries_by_color.items():
+        for color, rectangles in self.rectangles_by_color.items():
             cr.set_source_rgb(*color)
-            for drawing_entry in drawing_entries:
-                if drawing_entry.stop_x < clip_start_x or clip_stop_x < drawing_entry.start_x:
+            for start_x, stop_x, start_y in rectangles:
+                if stop_x < clip_start_x or clip_stop_x < start_x:
                     continue
-                cr.rectangle(drawing_entry.start_x, drawing_entry.start_y, drawing_entry.width, drawing_entry.height)
+                cr.rectangle(start_x, start_y, stop_x - start_x, self.timeline_height)
             cr.fill()
 
         # The marker for the logged entries
         cr.set_source_rgb(0.3, 0.3, 0.8)
-        for le in self.visible_logged_entries:
-            if le.stop_x < clip_start_x or clip_stop_x < le.start_x:
+        for start_x, stop_x in self.visible_logged_x_positions:
+            if stop_x < clip_start_x or clip_stop_x < start_x:
                 continue
-            cr.rectangle(le.start_x, self.le_start_y, le.width, 10)
+            cr.rectangle(start_x, self.le_start_y, stop_x - start_x, 10)
         cr.fill()
 
         # The marker for the tagged entries
         cr.set_source_rgb(1, 0.64, 0)
-        for te in self.visible_tagged_entries:
-            if te.stop_x < clip_start_x or clip_stop_x < te.start_x:
+        for _, start_x, stop_x in self.tagged_columns.iter_visible_positions():
+            if stop_x < clip_start_x or clip_stop_x < start_x:
                 continue
-            cr.rectangle(te.start_x, self.te_end_y - 10, te.width, 10)
-        cr.fill()
-
-        if self.current_tagged_entry is not None:
-            start_x = self.timeline_helper.datetime_to_pixel(self.current_tagged_entry.start)
-            stop_x = self.timeline_helper.datetime_to_pixel(self.current_tagged_entry.stop)
-            cr.set_source_rgba(0.2, 0.2, 0.2, 0.4)
-            cr.rectangle(start_x, 0, stop_x - start_x, drawing_area_height)
-            cr.fill()
-        elif self.zoom_state is not None:
-            start_x = self.timeline_helper.datetime_to_pixel(self.zoom_state.get_start())
-            stop_x = self.timeline_helper.datetime_to_pixel(self.zoom_state.get_stop())
-            cr.set_source_rgba(0.2, 0.6, 0.2, 0.4)
-            cr.rectangle(start_x, 0, stop_x - start_x, drawing_area_height)
-            cr.fill()
-
-        # Draw the sides
-        cr.set_source_rgba(0.5, 0.5, 0.5, 0.5)
-        cr.rectangle(0, 0, self.timeline_side_padding, drawing_area_height)
-        cr.fill()
-        cr.rectangle(canvas_width - self.timeline_side_padding, 0, canvas_width, drawing_area_height)
+            cr.rectangle(start_x, self.te_end_y - 10, stop_x - start_x, 10)
         cr.fill()
 
     @staticmethod
     def set_tagged_entry_stop_date(stop_date: datetime,
                                    tagged_entry: entity.TaggedEntry,
-                                   tagged_entries: List[TimelineEntry]) -> datetime.datetime:
+                                   tagged_entries: List[entity.TaggedEntry]) -> datetime.datetime:
         tagged_entry.stop = stop_date
 
         creation_is_right = stop_date == tagged_entry.stop
         date_to_use = None
         for t in tagged_entries:
             if creation_is_right:
-                if t.entry.start < stop_date and t.entry.stop > tagged_entry.start:
-                    date_to_use = t.entry.start
+                if t.start < stop_date and t.stop > tagged_entry.start:
+                    date_to_use = t.start
                     break
             else:
-                if stop_date < t.entry.stop and t.entry.start < tagged_entry.stop:
-                    date_to_use = t.entry.stop
+                if stop_date < t.stop and t.start < tagged_entry.stop:
+                    date_to_use = t.stop
 
         if date_to_use is not None:
             tagged_entry.stop = date_to_use
@@ -471,16 +488,16 @@ class TimelineCanvas(Gtk.DrawingArea):
             start_dt = self.timeline_start
             end_dt = self.timeline_end
 
-            for te in self.visible_tagged_entries:
+            for te in self.tagged_columns.get_visible_entries():
                 # Double click should not be possible if we are inside of a TaggedEntry
-                if te.entry.contains_datetime(current_moused_datetime):
+                if te.contains_datetime(current_moused_datetime):
                     return
 
                 # Update the intervals if necessary
-                if start_dt < te.entry.stop < current_moused_datetime:
-                    start_dt = te.entry.stop
-                elif current_moused_datetime < te.entry.start < end_dt:
-                    end_dt = te.entry.start
+                if start_dt < te.stop < current_moused_datetime:
+                    start_dt = te.stop
+                elif current_moused_datetime < te.start < end_dt:
+                    end_dt = te.start
                     break
             self.current_tagged_entry = entity.TaggedEntry(category=None, start=start_dt, stop=end_dt)
             return
@@ -489,10 +506,9 @@ class TimelineCanvas(Gtk.DrawingArea):
         if event.button == Gdk.BUTTON_SECONDARY:
             # Ensure that we are on the tagged entry timeline
             if self.te_start_y <= event.y <= self.te_end_y:
-                for te in self.visible_tagged_entries:
-                    if te.start_x <= event.x <= te.stop_x:
-                        self.context_menu.popup_at_coordinate(x=event.x, y=event.y, te=te.entry)
-                        break
+                index = self.tagged_columns.find_visible_index_by_x(event.x)
+                if index is not None:
+                    self.context_menu.popup_at_coordinate(x=event.x, y=event.y, te=self.tagged_columns.entries[index])
             return
 
         # We are beginning a zoom state
@@ -539,23 +555,17 @@ class TimelineCanvas(Gtk.DrawingArea):
 
         self.queue_draw()
 
+    def create_timeline_entry(self, columns: TimelineColumns, index: int, start_y: float) -> TimelineEntry:
+        timeline_entry = TimelineEntry(columns.entries[index], columns.get_color(index))
+        start_x, stop_x = columns.get_x_positions(index)
+        timeline_entry.set_draw_positions(start_x, stop_x, start_y, self.timeline_height)
+        return timeline_entry
+
     def find_visible_logged_entry_by_x_position(self, x: float) -> Optional[TimelineEntry]:
-        number_of_visible_logged_entries = len(self.visible_logged_entries)
-        if number_of_visible_logged_entries == 0:
+        index = self.logged_columns.find_visible_index_by_x(x)
+        if index is None:
             return None
-
-        current_start = 0
-        current_end = number_of_visible_logged_entries - 1
-        while current_start <= current_end:
-            middle = (current_start + current_end) // 2
-            current_entry = self.visible_logged_entries[middle]
-            if current_entry.start_x <= x <= current_entry.stop_x:
-                return current_entry
-            elif x < current_entry.start_x:
-                current_end = middle - 1
-            else:
-                current_start = middle + 1
-        return None
+        return self.create_timeline_entry(self.logged_columns, index, self.le_start_y)
 
     def _set_zoom_boundaries(self, start: datetime.datetime, stop: datetime.datetime):
         self.timeline_start = start
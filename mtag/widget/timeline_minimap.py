@@ -83,6 +83,13 @@ class TimelineMinimap(Gtk.DrawingArea):
         self._update_timeline_entries()
         self.queue_draw()
 
+    def add_logged_entries(self, logged_entries, changed_logged_entries) -> None:
+        self.logged_entries = logged_entries
+        TimelineMinimap._add_visible_timeline_entries(timeline_helper=self.timeline_helper,
+                                                      from_collection=changed_logged_entries,
+                                                      visible_collection=self.logged_timeline_entries)
+        self.queue_draw()
+
     def _set_boundaries_and_fire_new_boundary(self, actual_x: float):
         moused_dt = self.timeline_helper.pixel_to_datetime(actual_x)
         current_delta = self.boundary_stop - self.boundary_start
@@ -169,17 +176,19 @@ class TimelineMinimap(Gtk.DrawingArea):
                                               timeline_start_dt=self.current_date,
                                               timeline_stop_dt=self.end_of_current_date,
                                               timeline_side_padding=self.side_padding)
+        self.logged_timeline_entries.clear()
         TimelineMinimap._add_visible_timeline_entries(timeline_helper=self.timeline_helper,
                                                       from_collection=self.logged_entries,
                                                       visible_collection=self.logged_timeline_entries)
+        self.tagged_timeline_entries.clear()
         TimelineMinimap._add_visible_timeline_entries(timeline_helper=self.timeline_helper,
                                                       from_collection=self.tagged_entries,
                                                       visible_collection=self.tagged_timeline_entries)
 
     @staticmethod
     def _add_visible_timeline_entries(timeline_helper: TimelineHelper, from_collection: List, visible_collection: List) -> None:
-        visible_collection.clear()
-        previous_entry = None
+        # Continue from the last visible entry, so that new and extended entries can be added
+        previous_entry = visible_collection[-1] if visible_collection else None
         for from_entry in from_collection:
             timeline_entry = TimelineEntry(timeline_helper.datetime_to_pixel(from_entry.start),
                                            timeline_helper.datetime_to_pixel(from_entry.stop))
@@ -117,7 +117,7 @@ class TimelineOverlay(Gtk.DrawingArea):
         if current_tagged_entry is not None:
             datetime_used = timeline_canvas.set_tagged_entry_stop_date(current_moused_dt,
                                                                        current_tagged_entry,
-                                                                       timeline_canvas.tagged_entries)
+                                                                       timeline_canvas.tagged_columns.entries)
             start_x = int(timeline_helper.datetime_to_pixel(current_tagged_entry.start))
             stop_x = int(timeline_helper.datetime_to_pixel(current_tagged_entry.stop))
             state_overlay_dirty_rectangle = cairo.RectangleInt(start_x - 5, 0,
@@ -135,21 +135,21 @@ class TimelineOverlay(Gtk.DrawingArea):
                                                                stop_x - start_x + 10, canvas_height)
             self.dirty_rectangles.append(state_overlay_dirty_rectangle)
         else:
-            for t in self.timeline_canvas.visible_tagged_entries:
-                if mouse_x < t.start_x:
-                    break
-                elif mouse_x <= t.stop_x:
-                    start_delta = mouse_x - t.start_x
-                    stop_delta = t.stop_x - mouse_x
+            tagged_columns = timeline_canvas.tagged_columns
+            index = tagged_columns.find_visible_index_by_x(mouse_x)
+            if index is not None:
+                start_x, stop_x = tagged_columns.get_x_positions(index)
+                start_delta = mouse_x - start_x
+                stop_delta = stop_x - mouse_x
 
-                    next_moused_datetime = t.entry.start if start_delta < stop_delta else t.entry.stop
-                    break
+                t = tagged_columns.entries[index]
+                next_moused_datetime = t.start if start_delta < stop_delta else t.stop
 
         is_active = None
-        for ae in timeline_canvas.visible_activity_entries:
-            if ae.start_x <= mouse_x <= ae.stop_x:
-                is_active = ae.entry.active
-                break
+        activity_columns = timeline_canvas.activity_columns
+        index = activity_columns.find_visible_index_by_x(mouse_x)
+        if index is not None:
+            is_active = activity_columns.entries[index].active
 
         self.current_moused_datetime = next_moused_datetime
 
@@ -181,20 +181,21 @@ class TimelineOverlay(Gtk.DrawingArea):
                                                          int(timeline_canvas.timeline_height) + 10)
                 self.dirty_rectangles.append(highlight_rectangle)
         elif timeline_canvas.te_start_y <= mouse_y <= timeline_canvas.te_end_y:
-            for te in timeline_canvas.visible_tagged_entries:
-                if te.start_x <= mouse_x <= te.stop_x:
-                    self.moused_over_entity = te
-                    if current_tagged_entry is None:
-                        time_details = datetime_helper.to_time_text(te.entry.start, te.entry.stop, te.entry.duration)
-                        time_texts.append(time_details)
-                    desc_texts.append(te.entry.category_str)
-
-                    highlight_rectangle = cairo.RectangleInt(int(te.start_x) - 5,
-                                                             int(timeline_canvas.te_start_y) - 5,
-                                                             int(te.width) + 10,
-                                                             int(timeline_canvas.timeline_height) + 10)
-                    self.dirty_rectangles.append(highlight_rectangle)
-                    break
+            tagged_columns = timeline_canvas.tagged_columns
+            index = tagged_columns.find_visible_index_by_x(mouse_x)
+            if index is not None:
+                te = timeline_canvas.create_timeline_entry(tagged_columns, index, timeline_canvas.te_start_y)
+                self.moused_over_entity = te
+                if current_tagged_entry is None:
+                    time_details = datetime_helper.to_time_text(te.entry.start, te.entry.stop, te.entry.duration)
+                    time_texts.append(time_details)
+                desc_texts.append(te.entry.category_str)
+
+                highlight_rectangle = cairo.RectangleInt(int(te.start_x) - 5,
+                                                         int(timeline_canvas.te_start_y) - 5,
+                                                         int(te.width) + 10,
+                                                         int(timeline_canvas.timeline_height) + 10)
+                self.dirty_rectangles.append(highlight_rectangle)
 
         window: Gdk.Window = self.get_window()
         cr = window.cairo_create()
@@ -1,19 +1,26 @@
 import datetime
 from itertools import groupby
+import logging
+import sqlite3
 import webbrowser
+from typing import List
 
-from mtag.entity import TaggedEntry
+from mtag.entity import LoggedEntry, TaggedEntry
 from mtag.helper import datetime_helper, database_helper, link_helper
-from mtag.repository import LoggedEntryRepository, TaggedEntryRepository, ActivityEntryRepository
+from mtag.helper.change_feed_helper import ChangeFeed
+from mtag.helper.day_loading_helper import DayChanges, DayEntries, DayLoader
+from mtag.repository import TaggedEntryRepository
 from . import CalendarPanel, TimelineCanvas, TimelineMinimap, TimelineOverlay
 
 import gi
 
 gi.require_version("Gtk", "3.0")
-from gi.repository import Gtk, Gdk
+from gi.repository import Gtk, Gdk, GLib
 
 
 class TimelinePage(Gtk.Box):
+    CHANGE_POLL_INTERVAL_SECONDS = 1
+
     def __init__(self, parent: Gtk.Window):
         super().__init__(orientation=Gtk.Orientation.VERTICAL)
 
@@ -58,6 +65,9 @@ class TimelinePage(Gtk.Box):
 
         # Logged entries list
         self.logged_entries_list_store = Gtk.ListStore(str, str, str, str, str)
+        # The row of the latest logged entry, which is updated when the entry is extended
+        self._latest_logged_entry_row = None
+        self._latest_logged_entry_id = None
         self.logged_entries_tree_view = Gtk.TreeView.new_with_model(self.logged_entries_list_store)
 
         for i, title in enumerate(["Start", "Stop", "Duration", "Application", "Title"]):
@@ -90,11 +100,20 @@ class TimelinePage(Gtk.Box):
         notebook.append_page(letw_container, Gtk.Label(label="Logged entries"))
 
         self.pack_end(notebook, expand=True, fill=True, padding=10)
+
+        self.day_loader = DayLoader(on_loaded=self._set_day_entries, on_refreshed=self._add_day_changes)
         self._reload_logged_entries_from_date()
 
+        # Only the new and extended entries are fetched, and only after something has been written,
+        # so today can be kept up to date
+        self.change_feed = ChangeFeed()
+        GLib.timeout_add_seconds(TimelinePage.CHANGE_POLL_INTERVAL_SECONDS, self._do_poll_changes)
+
         self.show_all()
 
     def update_page(self):
+        # The categories may have been changed on the other pages
+        self.day_loader.invalidate_all()
         self._reload_logged_entries_from_date()
 
     def _do_button_press_te(self, w: Gtk.TreeView, e):
@@ -113,19 +132,24 @@ class TimelinePage(Gtk.Box):
     def _do_tagged_entry_created(self, _, te: TaggedEntry):
         tagged_entry_repository = TaggedEntryRepository()
         with database_helper.create_connection() as conn:
-            tagged_entry_repository.insert(conn=conn, tagged_entry=te)
+            from_datetime, to_datetime = tagged_entry_repository.insert(conn=conn, tagged_entry=te)
+
+        # The neighbours which the new entry has been merged with may reach into other days
+        self.day_loader.invalidate(from_datetime=from_datetime, to_datetime=to_datetime)
         self._reload_logged_entries_from_date()
 
     def _do_tagged_entry_edited(self, _, te: TaggedEntry):
         tagged_entry_repository = TaggedEntryRepository()
         with database_helper.create_connection() as conn:
             tagged_entry_repository.update(conn=conn, tagged_entry=te)
+        self.day_loader.invalidate(from_datetime=te.start, to_datetime=te.stop)
         self._reload_logged_entries_from_date()
 
     def _do_tagged_entry_deleted(self, _, te: TaggedEntry):
         tagged_entry_repository = TaggedEntryRepository()
         with database_helper.create_connection() as conn:
             tagged_entry_repository.delete(conn=conn, db_id=te.db_id)
+        self.day_loader.invalidate(from_datetime=te.start, to_datetime=te.stop)
         self._reload_logged_entries_from_date()
 
     def _on_new_day_selected(self, _, date: datetime.datetime):
@@ -133,25 +157,48 @@ class TimelinePage(Gtk.Box):
         self._reload_logged_entries_from_date()
 
     def _reload_logged_entries_from_date(self):
-        with database_helper.create_connection() as db_connection:
-            logged_entry_repository = LoggedEntryRepository()
-            tagged_entry_repository = TaggedEntryRepository()
-            activity_entry_repository = ActivityEntryRepository()
-
-            logged_entries = logged_entry_repository.get_all_by_date(db_connection, self._current_date)
-            tagged_entries = tagged_entry_repository.get_all_by_date(db_connection, self._current_date)
-            activity_entries = activity_entry_repository.get_all_by_date(db_connection, self._current_date)
+        self.day_loader.request(self._current_date)
+
+    def _do_poll_changes(self) -> bool:
+        # An exception would remove the timeout, which stops the refreshing for good
+        try:
+            if self.change_feed.has_changed():
+                self.day_loader.refresh(self._current_date)
+        except sqlite3.Error:
+            logging.exception("Failed to check the database for changes")
+        return True
+
+    def _add_day_changes(self, day_changes: DayChanges):
+        day_entries = day_changes.day_entries
+        self.timeline_canvas.add_entries(day_changes.logged_entries, day_changes.activity_entries)
+        self.timeline_minimap.add_logged_entries(day_entries.logged_entries, day_changes.logged_entries)
+        self._add_logged_entry_rows(day_changes.logged_entries)
+
+    def _add_logged_entry_rows(self, logged_entries: List[LoggedEntry]):
+        for le in logged_entries:
+            row = [datetime_helper.to_time_str(le.start),
+                   datetime_helper.to_time_str(le.stop),
+                   datetime_helper.to_duration_str(le.duration),
+                   le.application_window.application.name,
+                   le.application_window.title]
+            if le.db_id == self._latest_logged_entry_id:
+                self.logged_entries_list_store.set_row(self._latest_logged_entry_row, row)
+            else:
+                self._latest_logged_entry_row = self.logged_entries_list_store.append(row)
+                self._latest_logged_entry_id = le.db_id
+
+    def _set_day_entries(self, day_entries: DayEntries):
+        logged_entries = day_entries.logged_entries
+        tagged_entries = day_entries.tagged_entries
+        activity_entries = day_entries.activity_entries
 
         self.timeline_canvas.set_entries(self._current_date, logged_entries, tagged_entries, activity_entries)
         self.timeline_minimap.set_entries(self._current_date, logged_entries, tagged_entries)
 
         self.logged_entries_list_store.clear()
-        for le in logged_entries:
-            self.logged_entries_list_store.append([datetime_helper.to_time_str(le.start),
-                                                   datetime_helper.to_time_str(le.stop),
-                                                   datetime_helper.to_duration_str(le.duration),
-                                                   le.application_window.application.name,
-                                                   le.application_window.title])
+        self._latest_logged_entry_row = None
+        self._latest_logged_entry_id = None
+        self._add_logged_entry_rows(logged_entries)
         self.logged_entries_tree_view.columns_autosize()
 
         self.tagged_entries_list_store.clear()
@@ -0,0 +1,215 @@
+import os
+import subprocess
+import sys
+import types
+import unittest
+from collections import deque
+from unittest import mock
+
+from mtag.watcher import logind_lock_state
+
+
+SESSION_PATH = "/org/freedesktop/login1/session/_32"
+USER_PATH = "/org/freedesktop/login1/user/_1000"
+
+
+class FakeVariant:
+    def __init__(self, format_string: str, value):
+        self.format_string = format_string
+        self.value = value
+
+    def unpack(self):
+        return self.value
+
+
+class FakeMainContext:
+    # Holds the signals until the provider iterates the main context, like GLib does
+    def __init__(self):
+        self.pending = deque()
+
+    def iteration(self, may_block: bool) -> bool:
+        if not self.pending:
+            return False
+        self.pending.popleft()()
+        return True
+
+
+class FakeLogindBus:
+    # A stand-in for the system bus with the logind objects of a single graphical session
+    def __init__(self, locked_hint: bool, display=("2", SESSION_PATH)):
+        self.main_context = FakeMainContext()
+        self.locked_hint = locked_hint
+        self.display = display
+        self.session_proxies = []
+        self.locked_hint_reads = 0
+
+    def create_proxy(self, bus, flags, info, name, object_path, interface_name, cancellable):
+        assert bus is self and name == logind_lock_state.LOGIND_BUS_NAME
+        return FakeProxy(bus=self, object_path=object_path, interface_name=interface_name)
+
+    def call(self, object_path: str, method_name: str, parameters: FakeVariant) -> FakeVariant:
+        if method_name == "GetUser":
+            return FakeVariant("(o)", (USER_PATH,))
+        if method_name == "org.freedesktop.DBus.Properties.Get" and object_path == SESSION_PATH:
+            assert parameters.unpack() == (logind_lock_state.LOGIND_SESSION_INTERFACE, "LockedHint")
+            self.locked_hint_reads += 1
+            return FakeVariant("(v)", (self.locked_hint,))
+        raise AssertionError(f"Unexpected call of {method_name} on {object_path}")
+
+    def emit_properties_changed(self, changed_properties: dict, invalidated_properties=()):
+        if "LockedHint" in changed_properties:
+            self.locked_hint = changed_properties["LockedHint"]
+        for proxy in self.session_proxies:
+            self.main_context.pending.append(
+                lambda proxy=proxy: proxy.emit("g-properties-changed", FakeVariant("a{sv}", changed_properties),
+                                               list(invalidated_properties)))
+
+    def emit_signal(self, signal_name: str):
+        for proxy in self.session_proxies:
+            self.main_context.pending.append(
+                lambda proxy=proxy: proxy.emit("g-signal", logind_lock_state.LOGIND_BUS_NAME, signal_name,
+                                               FakeVariant("()", ())))
+
+
+class FakeProxy:
+    def __init__(self, bus: FakeLogindBus, object_path: str, interface_name: str):
+        self._bus = bus
+        self._object_path = object_path
+        self._handlers = {}
+        if object_path == SESSION_PATH:
+            bus.session_proxies.append(self)
+
+    def call_sync(self, method_name, parameters, flags, timeout, cancellable):
+        return self._bus.call(object_path=self._object_path, method_name=method_name, parameters=parameters)
+
+    def get_cached_property(self, name: str):
+        if self._object_path == USER_PATH and name == "Display" and self._bus.display is not None:
+            return FakeVariant("(so)", self._bus.display)
+        return None
+
+    def connect(self, signal_name: str, handler):
+        self._handlers.setdefault(signal_name, []).append(handler)
+
+    def emit(self, signal_name: str, *args):
+        for handler in self._handlers.get(signal_name, []):
+            handler(self, *args)
+
+
+def create_fake_gi(bus: FakeLogindBus):
+    gi = types.ModuleType("gi")
+    gi.require_version = lambda namespace, version: None
+    repository = types.ModuleType("gi.repository")
+    repository.GLib = types.SimpleNamespace(Variant=FakeVariant,
+                                            MainContext=types.SimpleNamespace(default=lambda: bus.main_context))
+    repository.Gio = types.SimpleNamespace(BusType=types.SimpleNamespace(SYSTEM="system"),
+                                           DBusCallFlags=types.SimpleNamespace(NONE=0),
+                                           DBusProxyFlags=types.SimpleNamespace(NONE=0),
+                                           DBusProxy=types.SimpleNamespace(new_sync=bus.create_proxy),
+                                           bus_get_sync=lambda bus_type, cancellable: bus)
+    gi.repository = repository
+    return {"gi": gi, "gi.repository": repository}
+
+
+class LogindLockStateProviderTest(unittest.TestCase):
+    def create_provider(self, bus: FakeLogindBus) -> logind_lock_state.LogindLockStateProvider:
+        with mock.patch.dict(sys.modules, create_fake_gi(bus)):
+            return logind_lock_state.LogindLockStateProvider()
+
+    def test_reads_the_locked_hint_once_at_start(self):
+        bus = FakeLogindBus(locked_hint=True)
+        provider = self.create_provider(bus)
+
+        self.assertTrue(provider.is_locked())
+        self.assertTrue(provider.is_locked())
+        self.assertEqual(1, bus.locked_hint_reads)
+
+    def test_follows_the_locked_hint_property(self):
+        bus = FakeLogindBus(locked_hint=False)
+        provider = self.create_provider(bus)
+
+        bus.emit_properties_changed({"LockedHint": True})
+        self.assertTrue(provider.is_locked())
+        bus.emit_properties_changed({"LockedHint": False})
+        self.assertFalse(provider.is_locked())
+        self.assertEqual(1, bus.locked_hint_reads)
+
+    def test_reads_an_invalidated_locked_hint_again(self):
+        bus = FakeLogindBus(locked_hint=False)
+        provider = self.create_provider(bus)
+
+        bus.locked_hint = True
+        bus.emit_properties_changed({}, invalidated_properties=["LockedHint"])
+        self.assertTrue(provider.is_locked())
+        self.assertEqual(2, bus.locked_hint_reads)
+
+    def test_follows_the_lock_and_unlock_signals(self):
+        bus = FakeLogindBus(locked_hint=False)
+        provider = self.create_provider(bus)
+
+        bus.emit_signal("Lock")
+        self.assertTrue(provider.is_locked())
+        bus.emit_signal("Unlock")
+        self.assertFalse(provider.is_locked())
+
+    def test_handles_all_pending_signals_in_one_call(self):
+        bus = FakeLogindBus(locked_hint=False)
+        provider = self.create_provider(bus)
+
+        bus.emit_signal("Lock")
+        bus.emit_signal("Unlock")
+        bus.emit_properties_changed({"LockedHint": True})
+        self.assertTrue(provider.is_locked())
+        self.assertEqual(0, len(bus.main_context.pending))
+
+    def test_fails_without_a_graphical_session(self):
+        bus = FakeLogindBus(locked_hint=False, display=("", "/"))
+        with self.assertRaises(RuntimeError):
+            self.create_provider(bus)
+
+
+class CreateLockStateProviderTest(unittest.TestCase):
+    def test_uses_logind_when_available(self):
+        bus = FakeLogindBus(locked_hint=False)
+        with mock.patch.dict(sys.modules, create_fake_gi(bus)):
+            provider = logind_lock_state.create_lock_state_provider()
+        self.assertIsInstance(provider, logind_lock_state.LogindLockStateProvider)
+
+    def test_falls_back_to_loginctl_without_pygobject(self):
+        with mock.patch.dict(sys.modules, {"gi": None}):
+            provider = logind_lock_state.create_lock_state_provider()
+        self.assertIsInstance(provider, logind_lock_state.LoginctlLockStateProvider)
+
+    def test_falls_back_to_loginctl_without_a_graphical_session(self):
+        bus = FakeLogindBus(locked_hint=False, display=None)
+        with mock.patch.dict(sys.modules, create_fake_gi(bus)):
+            provider = logind_lock_state.create_lock_state_provider()
+        self.assertIsInstance(provider, logind_lock_state.LoginctlLockStateProvider)
+
+
+class LoginctlLockStateProviderTest(unittest.TestCase):
+    def run_loginctl(self, locked_hints):
+        outputs = iter(locked_hints)
+        calls = []
+
+        def run(args, **kwargs):
+            calls.append(args)
+            if args[1] == "show-user":
+                return subprocess.CompletedProcess(args=args, returncode=0, stdout="2\n")
+            return subprocess.CompletedProcess(args=args, returncode=0, stdout=next(outputs))
+
+        provider = logind_lock_state.LoginctlLockStateProvider()
+        with mock.patch.object(logind_lock_state.subprocess, "run", side_effect=run):
+            results = [provider.is_locked() for _ in locked_hints]
+        return results, calls
+
+    def test_reads_the_locked_hint_of_the_display_session(self):
+        results, calls = self.run_loginctl([b"no\n", b"yes\n", b"unknown\n"])
+
+        self.assertEqual([False, True, False], results)
+        self.assertEqual(["loginctl", "show-user", "-pDisplay", "--value", str(os.getuid())], calls[0])
+        self.assertEqual(1, sum(1 for call in calls if call[1] == "show-user"))
+        self.assertTrue(all(call[-1] == "2" for call in calls[1:]))
+
+
+if __name__ == "__main__":
+    unittest.main()